@@ -45,11 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'system.middleware.RestrictAllExceptAdminSignupMiddleware',
-    'system.middleware.RestrictSetupAdminRegisterMiddleware',
-    'system.middleware.LoginRequiredMiddleware',
-    'system.middleware.RestrictLoginPathMiddleware',
-    'system.middleware.RestrictSetupPathsMiddleware',
+    'system.middleware.SetupAuthGateMiddleware',
     'django_browser_reload.middleware.BrowserReloadMiddleware',
 ]
 
@@ -81,6 +77,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the default in-memory test database: the queue rank
+        # allocation tests write from several threads, which a shared-cache
+        # in-memory database rejects with "table is locked" instead of waiting.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import Customer, Service, Order, Payment, Inventory, Production, PricingOption, Supplier, PaymentMethod, InventoryCategory
-from .models import BusinessDetails, Equipment, SystemSettings, CustomizationOption
+from .models import BusinessDetails, Equipment, SystemSettings, CustomizationOption, QualityCheck
 
 admin.site.register(Customer)
 admin.site.register(Service)
@@ -13,6 +13,7 @@ admin.site.register(Inventory)
 admin.site.register(InventoryCategory)
 admin.site.register(Supplier)
 admin.site.register(Production)
+admin.site.register(QualityCheck)
 admin.site.register(BusinessDetails)
 admin.site.register(Equipment)
 admin.site.register(SystemSettings)
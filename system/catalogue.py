@@ -0,0 +1,61 @@
+import threading
+from .models import Sequence, Service
+
+# The order form's service catalogue (services -> customization options -> pricing
+# options) as one JSON-ready document. It is built in-process and reused until the
+# `catalogue` Sequence moves; the signal receivers in `system.signals` bump it when a
+# Service, CustomizationOption or PricingOption changes, so every worker rebuilds on
+# its next request and the version doubles as the HTTP ETag.
+CATALOGUE_SEQUENCE = 'catalogue'
+
+_lock = threading.Lock()
+_cached = (None, None)  # (version, document)
+
+
+def bump_catalogue_version():
+    Sequence.next_value(CATALOGUE_SEQUENCE)
+
+
+def catalogue_version():
+    return Sequence.objects.filter(name=CATALOGUE_SEQUENCE).values_list('value', flat=True).first() or 0
+
+
+def build_catalogue(version):
+    services = Service.objects.order_by('name').prefetch_related(
+        'customization_options', 'pricing_options__customization_option'
+    )
+    document = {'version': version, 'services': []}
+    for service in services:
+        pricing = service.get_pricing_options_by_customization()
+        document['services'].append({
+            'id': service.service_id,
+            'name': service.name,
+            'customizations': [
+                {
+                    'id': customization.id,
+                    'name': customization.name,
+                    'pricing_options': [
+                        {'id': option.id, 'description': option.description, 'price': str(option.price)}
+                        for option in pricing.get(customization, [])
+                    ],
+                }
+                for customization in sorted(service.customization_options.all(), key=lambda option: option.id)
+            ],
+        })
+    return document
+
+
+def get_catalogue(version=None):
+    """The catalogue document for the current version, built at most once per version."""
+    global _cached
+    version = catalogue_version() if version is None else version
+    cached_version, document = _cached
+    if document is not None and cached_version == version:
+        return document
+
+    with _lock:
+        cached_version, document = _cached
+        if document is None or cached_version != version:
+            document = build_catalogue(version)
+            _cached = (version, document)
+    return document
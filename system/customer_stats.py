@@ -0,0 +1,154 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Customer, Order, Payment
+
+# Per-customer lifetime totals stored on Customer (see Customer.STATS_FIELDS):
+#
+#   total_billed         amount of every payment that is not FAILED or REFUNDED
+#   total_paid           amount of PAID payments plus amount_paid of PARTIALLY_PAID ones
+#   outstanding_balance  total_billed - total_paid
+#   order_count          number of orders
+#   last_order_at        created_at of the newest order
+#
+# The signal receivers in `system.signals` call the hooks below, which apply each
+# change as a delta to the one customer it affects. `rebuild()` (the
+# `rebuild_customer_stats` command) recomputes every customer from the raw tables.
+STATS_FIELDS = Customer.STATS_FIELDS
+ZERO = Decimal('0.00')
+UNBILLED_STATUSES = ('FAILED', 'REFUNDED')
+
+
+def _payment_totals(payment):
+    """(billed, paid) one payment contributes to its customer."""
+    if payment is None or payment.status in UNBILLED_STATUSES:
+        return ZERO, ZERO
+    if payment.status == 'PAID':
+        return payment.amount, payment.amount
+    if payment.status == 'PARTIALLY_PAID':
+        return payment.amount, payment.amount_paid or ZERO
+    return payment.amount, ZERO
+
+
+def _customer_id(order_id):
+    return Order.objects.filter(pk=order_id).values_list('customer_id', flat=True).first()
+
+
+def _add(customer_id, billed=ZERO, paid=ZERO):
+    if customer_id is None or not (billed or paid):
+        return
+    Customer.objects.filter(pk=customer_id).update(
+        total_billed=F('total_billed') + billed,
+        total_paid=F('total_paid') + paid,
+        outstanding_balance=F('outstanding_balance') + (billed - paid),
+    )
+
+
+@transaction.atomic
+def payment_post_save(payment, before):
+    new_billed, new_paid = _payment_totals(payment)
+    old_billed, old_paid = _payment_totals(before)
+    if before is not None and before.order_id != payment.order_id:
+        _add(_customer_id(before.order_id), -old_billed, -old_paid)
+        old_billed, old_paid = ZERO, ZERO
+    _add(_customer_id(payment.order_id), new_billed - old_billed, new_paid - old_paid)
+
+
+def payment_post_delete(payment):
+    # Cascades delete an order's payments before the order, so it can still be looked up.
+    billed, paid = _payment_totals(payment)
+    _add(_customer_id(payment.order_id), -billed, -paid)
+
+
+def order_post_save(order, before):
+    if before is None:
+        Customer.objects.filter(pk=order.customer_id).update(
+            order_count=F('order_count') + 1,
+            last_order_at=Greatest(Coalesce('last_order_at', Value(order.created_at)), Value(order.created_at)),
+        )
+    elif before.customer_id != order.customer_id:
+        # The order took its payments along; recount both customers.
+        refresh([before.customer_id, order.customer_id])
+
+
+def order_post_delete(order):
+    Customer.objects.filter(pk=order.customer_id).update(
+        order_count=F('order_count') - 1,
+        last_order_at=Subquery(
+            Order.objects.filter(customer_id=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+        ),
+    )
+
+
+def compute(customer_ids=None):
+    """
+    {customer_id: {stats field: value}} recomputed from the raw tables in two grouped
+    queries, for the given customers or all of them.
+    """
+    payments = Payment.objects.exclude(status__in=UNBILLED_STATUSES)
+    orders = Order.objects.all()
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        payments = payments.filter(order__customer_id__in=customer_ids)
+        orders = orders.filter(customer_id__in=customer_ids)
+        customers = customers.filter(pk__in=customer_ids)
+
+    stats = {
+        customer_id: {
+            'total_billed': ZERO, 'total_paid': ZERO, 'outstanding_balance': ZERO,
+            'order_count': 0, 'last_order_at': None,
+        }
+        for customer_id in customers.values_list('pk', flat=True)
+    }
+    payment_totals = payments.values('order__customer_id').annotate(
+        billed=Sum('amount'),
+        paid=Sum('amount', filter=Q(status='PAID')),
+        partially_paid=Sum('amount_paid', filter=Q(status='PARTIALLY_PAID')),
+    ).order_by()
+    for row in payment_totals:
+        billed = row['billed'] or ZERO
+        paid = (row['paid'] or ZERO) + (row['partially_paid'] or ZERO)
+        stats[row['order__customer_id']].update(
+            total_billed=billed, total_paid=paid, outstanding_balance=billed - paid,
+        )
+    order_totals = orders.values('customer_id').annotate(count=Count('order_id'), latest=Max('created_at')).order_by()
+    for row in order_totals:
+        stats[row['customer_id']].update(order_count=row['count'], last_order_at=row['latest'])
+    return stats
+
+
+@transaction.atomic
+def refresh(customer_ids=None):
+    """Overwrite the stored totals of the given customers (default: all) with fresh ones."""
+    stats = compute(customer_ids)
+    customers = list(Customer.objects.filter(pk__in=stats).only('pk'))
+    for customer in customers:
+        for field, value in stats[customer.pk].items():
+            setattr(customer, field, value)
+    Customer.objects.bulk_update(customers, STATS_FIELDS, batch_size=500)
+    return len(customers)
+
+
+def rebuild():
+    return refresh(None)
+
+
+def _normalized(value):
+    return value.quantize(Decimal('0.01')) if isinstance(value, Decimal) else value
+
+
+def check():
+    """Return {customer_id: {field: (stored, expected)}} for customers whose totals drifted."""
+    expected = compute()
+    stored = Customer.objects.values('pk', *STATS_FIELDS)
+    mismatches = {}
+    for row in stored:
+        fresh = expected.get(row['pk'], {})
+        drifted = {
+            field: (row[field], fresh[field]) for field in STATS_FIELDS
+            if _normalized(row[field]) != _normalized(fresh[field])
+        }
+        if drifted:
+            mismatches[row['pk']] = drifted
+    return mismatches
@@ -0,0 +1,52 @@
+import threading
+from .models import Inventory, Sequence
+
+# Which materials each piece of equipment can use: the materials of every inventory
+# category associated with it. The whole mapping comes from one join query and is
+# kept in-process until the `equipment_materials` Sequence moves; the signal
+# receivers in `system.signals` bump it when Inventory, InventoryCategory, Equipment
+# or the category/equipment association changes.
+EQUIPMENT_MATERIALS_SEQUENCE = 'equipment_materials'
+
+_lock = threading.Lock()
+_cached = (None, None)  # (version, {equipment_id: [{'id', 'name'}]})
+
+
+def bump_equipment_materials_version():
+    Sequence.next_value(EQUIPMENT_MATERIALS_SEQUENCE)
+
+
+def equipment_materials_version():
+    return Sequence.objects.filter(name=EQUIPMENT_MATERIALS_SEQUENCE).values_list('value', flat=True).first() or 0
+
+
+def build_equipment_materials():
+    """{equipment_id: [{'id', 'name'}]}, materials grouped by category as before."""
+    rows = (
+        Inventory.objects.filter(category__associated_equipment__isnull=False)
+        .order_by('category_id', 'material_id')
+        .values_list('category__associated_equipment', 'material_id', 'name')
+    )
+    mapping = {}
+    for equipment_id, material_id, name in rows:
+        mapping.setdefault(equipment_id, []).append({'id': material_id, 'name': name})
+    return mapping
+
+
+def get_equipment_materials(version=None):
+    global _cached
+    version = equipment_materials_version() if version is None else version
+    cached_version, mapping = _cached
+    if mapping is not None and cached_version == version:
+        return mapping
+
+    with _lock:
+        cached_version, mapping = _cached
+        if mapping is None or cached_version != version:
+            mapping = build_equipment_materials()
+            _cached = (version, mapping)
+    return mapping
+
+
+def materials_for_equipment(equipment_id):
+    return get_equipment_materials().get(equipment_id, [])
@@ -5,7 +5,7 @@ from django.utils.timezone import now
 from decimal import Decimal
 from .models import (
     Customer, Service, CustomizationOption, Order, Payment, PricingOption,
-    Inventory, InventoryCategory, Supplier, Equipment, Production, PaymentMethod
+    Inventory, InventoryCategory, Supplier, Equipment, Production, PaymentMethod, QualityCheck
 )
 import random
 from datetime import datetime
@@ -84,6 +84,7 @@ from django.utils.timezone import make_aware
 import factory
 from factory.django import DjangoModelFactory
 from system.models import Order
+from system.order_queue import next_queue_rank
 
 
 class OrderFactory(DjangoModelFactory):
@@ -121,9 +122,7 @@ class OrderFactory(DjangoModelFactory):
             obj.order_queue = None 
         else:
 
-            max_queue = Order.objects.filter(status__in=['PENDING', 'IN PROGRESS']).aggregate(max_queue=models.Max('order_queue'))['max_queue']
-
-            obj.order_queue = (max_queue or 0) + 1
+            obj.order_queue = next_queue_rank()
             obj.completed_or_cancelled = None 
 
         obj.save()
@@ -215,12 +214,14 @@ class ProductionFactory(factory.django.DjangoModelFactory):
 
         return [{"equipment_id": eq.equipment_id} for eq in Equipment.objects.order_by("?")[:2]]
 
-    @factory.lazy_attribute
-    def quality_checks(self):
+    @factory.post_generation
+    def quality_checks(self, create, extracted, **kwargs):
+        if not create:
+            return
 
         num_checks = random.randint(2, 5)
         if self.status == "COMPLETED":
-            return [
+            checks = [
                 {
                     "parameter": f"Parameter {i+1}",
                     "result": "pass",
@@ -229,7 +230,7 @@ class ProductionFactory(factory.django.DjangoModelFactory):
                 for i in range(num_checks)
             ]
         else:
-            return [
+            checks = [
                 {
                     "parameter": f"Parameter {i+1}",
                     "result": random.choice(["pass", "fail"]),
@@ -237,4 +238,5 @@ class ProductionFactory(factory.django.DjangoModelFactory):
                 }
                 for i in range(num_checks)
             ]
+        QualityCheck.objects.bulk_create(QualityCheck(job=self, **check) for check in extracted or checks)
 
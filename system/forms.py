@@ -441,7 +441,7 @@ class OrderForm(forms.ModelForm):
 class ProductionForm(forms.ModelForm):
     class Meta:
         model = Production
-        fields = ['order', 'materials', 'equipment_assigned', 'quality_checks', 'status']
+        fields = ['order', 'materials', 'equipment_assigned', 'status']
 
     materials = forms.ModelMultipleChoiceField(
         queryset=Inventory.objects.all(),
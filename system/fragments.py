@@ -0,0 +1,30 @@
+from django.db import transaction
+from .models import Sequence
+
+# Rendered template fragments are cached with `{% cache %}` and keyed on the
+# generation of every model they show. A generation is a `Sequence` row bumped by the
+# save/delete receivers in `system.signals`, so a change invalidates exactly the
+# fragments that depend on that model, in every worker process, without waiting for
+# a timeout. Stale entries are never read again and age out of the cache.
+#
+# Every save of a model bumps the same row, so the bump waits for the surrounding
+# transaction to commit: the row is then locked for one short UPDATE rather than for
+# the rest of the writer's transaction, and no request can cache a fragment of
+# uncommitted data under the new generation.
+GENERATION_SEQUENCE = 'generation:{}'
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def bump_generation(model):
+    name = GENERATION_SEQUENCE.format(model._meta.model_name)
+    transaction.on_commit(lambda: Sequence.next_value(name))
+
+
+def generations(*models):
+    """
+    {model_name: generation} for the given models, read in one query. Pass the result
+    to the template as `generations` and vary `{% cache %}` on e.g. `generations.order`.
+    """
+    names = {GENERATION_SEQUENCE.format(model._meta.model_name): model._meta.model_name for model in models}
+    stored = dict(Sequence.objects.filter(name__in=names).values_list('name', 'value'))
+    return {model_name: stored.get(name, 0) for name, model_name in names.items()}
@@ -0,0 +1,48 @@
+from django.db.models import Count, DateField, Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+from .metrics import ZERO
+from .models import Order, Payment, Production
+
+
+def dashboard_kpis():
+    """
+    Headline dashboard numbers computed live from the raw tables in three statements:
+
+    1. one pass over Payment for the paid revenue and the overdue payments, using
+       conditional aggregation with a correlated EXISTS for "production completed";
+    2. one pass over Order for the count per status;
+    3. the paid revenue grouped by month.
+
+    The dashboard page reads the same figures from the `system.metrics` rollups; this
+    is the source of truth they can be compared against, served by `dashboard_kpis_json`.
+    """
+    completed_production = Exists(
+        Production.objects.filter(order_id=OuterRef('order_id'), status='COMPLETED')
+    )
+    payments = Payment.objects.aggregate(
+        total_revenue=Sum('amount', filter=Q(status='PAID')),
+        overdue_payments=Sum('amount', filter=Q(status='PENDING') & Q(completed_production)),
+    )
+
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+    # Aliases are positional: status values such as 'IN PROGRESS' are not valid SQL aliases.
+    orders = Order.objects.aggregate(
+        **{f'status_{index}': Count('order_id', filter=Q(status=status)) for index, status in enumerate(statuses)}
+    )
+
+    months = (
+        Payment.objects.filter(status='PAID')
+        .annotate(month=TruncMonth('payment_date', output_field=DateField()))
+        .values('month')
+        .annotate(total=Sum('amount'))
+        .order_by('month')
+        .values_list('month', 'total')
+    )
+
+    return {
+        'total_revenue': payments['total_revenue'] or ZERO,
+        'overdue_payments': payments['overdue_payments'] or ZERO,
+        'revenue_months': list(months),
+        'order_status_counts': [orders[f'status_{index}'] for index in range(len(statuses))],
+        'order_status_labels': [label for _, label in Order.STATUS_CHOICES],
+    }
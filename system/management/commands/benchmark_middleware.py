@@ -0,0 +1,55 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the system.middleware chain configured in settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Requests to time per path.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # Wrap a no-op view with only this app's middlewares, in settings order.
+        chain = lambda request: HttpResponse()
+        middleware_paths = [path for path in settings.MIDDLEWARE if path.startswith('system.middleware.')]
+        for path in reversed(middleware_paths):
+            chain = import_string(path)(chain)
+        self.stdout.write(f"Middlewares: {', '.join(path.rsplit('.', 1)[-1] for path in middleware_paths)}")
+
+        user = User.objects.filter(is_superuser=True, is_active=True).first() or AnonymousUser()
+        factory = RequestFactory()
+        targets = [
+            ('static', f"/{settings.STATIC_URL.lstrip('/')}styles/orders_new.css"),
+            ('page', reverse('dashboard')),
+            ('setup', reverse('business_details')),
+        ]
+
+        for label, path in targets:
+            request = factory.get(path)
+            request.user = user
+            chain(request)  # Warm up URL resolver and caches
+
+            query_count = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                query_count[0] += 1
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    chain(request)
+                elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f"{label:<8}{path:<45}{elapsed / iterations * 1e6:9.1f} us/request"
+                f"{query_count[0] / iterations:7.2f} queries/request"
+            )
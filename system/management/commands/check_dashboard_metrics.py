@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from system import metrics
+
+class Command(BaseCommand):
+    help = 'Compare the stored dashboard metrics with a fresh computation from the raw tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the metrics if they have drifted')
+
+    def handle(self, *args, **options):
+        mismatches = metrics.check()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Dashboard metrics are consistent."))
+            return
+
+        for (kind, key), (stored, expected) in sorted(mismatches.items(), key=str):
+            self.stdout.write(f"{kind} {key}: stored {stored}, expected {expected}")
+
+        if options['fix']:
+            metrics.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt after {len(mismatches)} mismatches."))
+        else:
+            raise CommandError(f"{len(mismatches)} dashboard metrics have drifted; run rebuild_dashboard_metrics.")
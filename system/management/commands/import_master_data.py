@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from system.master_data import IMPORTERS, read_rows
+from system.setup_import import BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Import services, pricing options, inventory, suppliers or customers from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='What the file contains')
+        parser.add_argument('path', help='CSV file with a header row, or a JSON Lines file (.jsonl)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Override the format guessed from the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per bulk insert and transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        def report_error(line_number, message):
+            self.stderr.write(f"line {line_number}: {message}")
+
+        start = time.perf_counter()
+        try:
+            rows = read_rows(options['path'], options['format'])
+            importer = IMPORTERS[options['kind']](batch_size=options['batch_size'], dry_run=options['dry_run'])
+            importer.run(rows, on_error=report_error)
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+        elapsed = time.perf_counter() - start
+
+        verb = 'validated' if options['dry_run'] else 'imported'
+        summary = (
+            f"{importer.created} {options['kind']} rows {verb}, {importer.skipped} skipped as duplicates, "
+            f"{importer.errors} rejected in {elapsed:.2f}s."
+        )
+        self.stdout.write(self.style.WARNING(summary) if importer.errors else self.style.SUCCESS(summary))
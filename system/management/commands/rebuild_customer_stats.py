@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from system import customer_stats
+
+class Command(BaseCommand):
+    help = 'Recompute the per-customer lifetime totals from the Order and Payment tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report customers whose totals have drifted')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = customer_stats.check()
+            for customer_id, fields in sorted(mismatches.items()):
+                for field, (stored, expected) in fields.items():
+                    self.stdout.write(f"customer {customer_id} {field}: stored {stored}, expected {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} customers have drifted totals; run rebuild_customer_stats.")
+            self.stdout.write(self.style.SUCCESS("Customer totals are consistent."))
+            return
+
+        count = customer_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Customer totals rebuilt for {count} customers."))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from system import metrics
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters and revenue buckets from the Payment, Order and Production tables'
+
+    def handle(self, *args, **options):
+        values = metrics.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Dashboard metrics rebuilt ({len(values)} rows)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from system.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the order search index from the Order, Customer and Service tables'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.create_table()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Order search index rebuilt ({backend.__class__.__name__})."))
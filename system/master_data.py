@@ -0,0 +1,260 @@
+import csv
+import json
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .catalogue import bump_catalogue_version
+from .equipment_materials import bump_equipment_materials_version
+from .fragments import bump_generation
+from .forms import ServiceForm, InventoryForm, SupplierForm, CustomerForm
+from .models import Service, CustomizationOption, PricingOption, Inventory, InventoryCategory, Supplier, Customer
+from .setup_import import BATCH_SIZE, resolve_names
+
+# Bulk import of catalogue and master data from CSV or JSON Lines files, used by the
+# `import_master_data` command. Rows are read one at a time, validated with the same
+# forms as the setup wizard and written in `bulk_create` batches, one transaction per
+# batch, so memory stays flat however large the file is. Lookups shared between rows
+# (services, customization options, categories, suppliers) are resolved once per batch.
+
+
+def read_rows(path, file_format=None):
+    """Yield (line number, row dict) from a .csv file (with a header row) or a .jsonl file."""
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError as error:
+                        yield line_number, error
+                        continue
+                    yield line_number, row
+
+
+def _form_errors(form):
+    return '; '.join(
+        f"{field}: {' '.join(messages)}" if field != '__all__' else ' '.join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+class MasterDataImporter:
+    """
+    Validates rows one by one and writes the valid ones in batches. Subclasses
+    implement `clean(row)`, returning the item to write or raising ValueError with
+    the reason, and `write(items)`, returning how many rows were inserted.
+    """
+    # Models whose fragment-cache generation is bumped after an import.
+    models = ()
+    changes_catalogue = False
+    changes_equipment_materials = False
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.created = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def clean(self, row):
+        raise NotImplementedError
+
+    def write(self, items):
+        raise NotImplementedError
+
+    def run(self, rows, on_error=None):
+        """Import (line number, row) pairs; `on_error(line_number, message)` reports bad rows."""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            items = []
+            for line_number, row in chunk:
+                try:
+                    if not isinstance(row, dict):
+                        raise ValueError(f"not a JSON object ({row})" if isinstance(row, Exception) else "not an object")
+                    items.append(self.clean(row))
+                except ValueError as error:
+                    self.errors += 1
+                    if on_error:
+                        on_error(line_number, str(error))
+            if items and not self.dry_run:
+                with transaction.atomic():
+                    written = self.write(items)
+                self.created += written
+                self.skipped += len(items) - written
+            elif items:
+                self.created += len(items)
+
+        if self.created and not self.dry_run:
+            if self.changes_catalogue:
+                bump_catalogue_version()
+            if self.changes_equipment_materials:
+                bump_equipment_materials_version()
+            for model in self.models:
+                bump_generation(model)
+        return self
+
+
+class ServiceImporter(MasterDataImporter):
+    """Columns: name, customization_options ('a|b' in CSV, a list in JSONL)."""
+    changes_catalogue = True
+
+    def clean(self, row):
+        options = row.get('customization_options') or []
+        if isinstance(options, str):
+            options = options if options.lstrip().startswith('[') else json.dumps(
+                [option.strip() for option in options.split('|') if option.strip()]
+            )
+        else:
+            options = json.dumps(options)
+        form = ServiceForm(data={'name': row.get('name', ''), 'customization_options': options})
+        if not form.is_valid():
+            raise ValueError(_form_errors(form))
+        return form.instance, [option.lower() for option in form.cleaned_data['customization_options']]
+
+    def write(self, items):
+        customizations, _ = resolve_names(
+            CustomizationOption, 'name', (name for _, names in items for name in names)
+        )
+        services = Service.objects.bulk_create([service for service, _ in items], batch_size=self.batch_size)
+        Through = Service.customization_options.through
+        Through.objects.bulk_create(
+            [
+                Through(service_id=service.pk, customizationoption_id=customizations[name].pk)
+                for service, (_, names) in zip(services, items) for name in set(names)
+            ],
+            batch_size=self.batch_size,
+        )
+        return len(services)
+
+
+class PricingOptionImporter(MasterDataImporter):
+    """
+    Columns: service (name), customization_option (name), description, price. The
+    customization option is created and linked to the service when it is missing.
+    """
+    changes_catalogue = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.services = {}
+        for service_id, name in Service.objects.order_by('-pk').values_list('service_id', 'name'):
+            self.services[name] = service_id  # the oldest service wins on duplicate names
+
+    def clean(self, row):
+        service_id = self.services.get(row.get('service'))
+        if service_id is None:
+            raise ValueError(f"service: Unknown service {row.get('service')!r}.")
+        customization = (row.get('customization_option') or '').strip().lower()
+        if not customization:
+            raise ValueError("customization_option: This field is required.")
+        option = PricingOption(
+            service_id=service_id, description=row.get('description') or '', price=row.get('price'),
+        )
+        try:
+            option.clean_fields(exclude=['service', 'customization_option'])
+        except ValidationError as error:
+            raise ValueError('; '.join(
+                f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items()
+            ))
+        return option, customization
+
+    def write(self, items):
+        customizations, _ = resolve_names(CustomizationOption, 'name', (name for _, name in items))
+        for option, name in items:
+            option.customization_option = customizations[name]
+        Through = Service.customization_options.through
+        Through.objects.bulk_create(
+            [
+                Through(service_id=service_id, customizationoption_id=customization_id)
+                for service_id, customization_id in {
+                    (option.service_id, option.customization_option_id) for option, _ in items
+                }
+            ],
+            ignore_conflicts=True,
+        )
+        return len(PricingOption.objects.bulk_create([option for option, _ in items], batch_size=self.batch_size))
+
+
+class InventoryImporter(MasterDataImporter):
+    """Columns: name, category, stock_level, reorder_threshold, unit_of_measurement, supplier."""
+    models = (Inventory, InventoryCategory, Supplier)
+    changes_equipment_materials = True
+
+    def clean(self, row):
+        form = InventoryForm(data=row)
+        if not form.is_valid():
+            raise ValueError(_form_errors(form))
+        return form.instance, form.cleaned_data['category'], form.cleaned_data['supplier'] or None
+
+    def write(self, items):
+        categories, _ = resolve_names(InventoryCategory, 'category_name', (category for _, category, _ in items))
+        suppliers, _ = resolve_names(Supplier, 'supplier_name', (supplier for _, _, supplier in items if supplier))
+        materials = []
+        for material, category, supplier in items:
+            material.category = categories[category]
+            material.supplier = suppliers[supplier] if supplier else None
+            materials.append(material)
+        return len(Inventory.objects.bulk_create(materials, batch_size=self.batch_size))
+
+
+class SupplierImporter(MasterDataImporter):
+    """Columns: supplier_name, contact_person, phone_number, email, address, additional_info."""
+    models = (Supplier,)
+
+    def clean(self, row):
+        form = SupplierForm(data=row)
+        if not form.is_valid():
+            raise ValueError(_form_errors(form))
+        return form.instance
+
+    def write(self, items):
+        return len(Supplier.objects.bulk_create(items, batch_size=self.batch_size))
+
+
+class CustomerImporter(MasterDataImporter):
+    """
+    Columns: name, contact_number, email, address. A row matching an existing
+    customer's normalized name and phone (see Customer.refresh_lookup_keys), or an
+    earlier row of the same batch, is skipped.
+    """
+    models = (Customer,)
+
+    def clean(self, row):
+        form = CustomerForm(data=row)
+        if not form.is_valid():
+            raise ValueError(_form_errors(form))
+        customer = form.instance
+        # Customer.save() fills the lookup keys; bulk_create does not call it.
+        customer.refresh_lookup_keys()
+        return customer
+
+    def write(self, items):
+        seen = set(
+            Customer.objects.filter(phone_key__in={customer.phone_key for customer in items}).values_list(
+                'name_key', 'phone_key'
+            )
+        )
+        customers = []
+        for customer in items:
+            key = (customer.name_key, customer.phone_key)
+            if key not in seen:
+                seen.add(key)
+                customers.append(customer)
+        return len(Customer.objects.bulk_create(customers, batch_size=self.batch_size))
+
+
+IMPORTERS = {
+    'services': ServiceImporter,
+    'pricing': PricingOptionImporter,
+    'inventory': InventoryImporter,
+    'suppliers': SupplierImporter,
+    'customers': CustomerImporter,
+}
@@ -0,0 +1,280 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import DateField, F, Max, Sum, Count
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import DashboardCounter, Order, Payment, Production, RevenueBucket
+
+# Dashboard rollups. `DashboardCounter` holds the running totals and `RevenueBucket`
+# the paid revenue per day and per month; both are kept current by the signal
+# receivers in `system.signals`, which call the `payment_*`, `order_*` and
+# `production_*` hooks below. Queryset `update()`/`bulk_create()` bypass signals, so
+# `rebuild()` (the `rebuild_dashboard_metrics` command) recomputes everything from
+# the raw tables and `check()` (`check_dashboard_metrics`) reports any drift.
+REVENUE_COUNTER = 'total_revenue'
+OVERDUE_COUNTER = 'overdue_payments'
+OVERDUE_ORDER_COUNTER = 'overdue_payments:order:{}'
+ORDER_STATUS_COUNTER = 'orders:{}'
+
+ZERO = Decimal('0.00')
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _payment_day(payment):
+    return timezone.localtime(payment.payment_date).date()
+
+
+def _payment_revenue(payment):
+    """Counter and bucket amounts one payment contributes to the paid revenue."""
+    if payment is None or payment.status != 'PAID' or payment.payment_date is None:
+        return {}
+    day = _payment_day(payment)
+    return {
+        ('counter', REVENUE_COUNTER): payment.amount,
+        ('day', day): payment.amount,
+        ('month', _month_start(day)): payment.amount,
+    }
+
+
+def _order_overdue(order_id):
+    """Pending payment total of an order whose production is completed, else zero."""
+    if not Production.objects.filter(order_id=order_id, status='COMPLETED').exists():
+        return ZERO
+    return Payment.objects.filter(order_id=order_id, status='PENDING').aggregate(
+        total=Sum('amount')
+    )['total'] or ZERO
+
+
+def _bump(model, lookup, field, delta):
+    if not delta:
+        return
+    changes = {field: F(field) + delta, 'updated_at': timezone.now()}
+    if not model.objects.filter(**lookup).update(**changes):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**changes)
+
+
+@transaction.atomic
+def apply_deltas(deltas):
+    """Add {('counter', name) | ('day' | 'month', date): amount} to the stored rollups."""
+    for (kind, key), delta in deltas.items():
+        if kind == 'counter':
+            _bump(DashboardCounter, {'name': key}, 'value', delta)
+        else:
+            _bump(RevenueBucket, {'period': kind, 'start': key}, 'total', delta)
+
+
+def _difference(new, old):
+    deltas = defaultdict(lambda: ZERO)
+    for key, amount in new.items():
+        deltas[key] += amount
+    for key, amount in old.items():
+        deltas[key] -= amount
+    return {key: amount for key, amount in deltas.items() if amount}
+
+
+@transaction.atomic
+def settle_overdue(order_ids):
+    """
+    Bring the overdue total in line with the current state of the given orders.
+
+    Each order's last counted amount is stored in its own counter row, so settling is
+    idempotent: a cascade that deletes an order's payments and productions one by one
+    adjusts the total once, however many receivers call this for the same order.
+    """
+    for order_id in set(order_ids):
+        if order_id is None:
+            continue
+        name = OVERDUE_ORDER_COUNTER.format(order_id)
+        current = _order_overdue(order_id)
+        counted = DashboardCounter.objects.select_for_update().filter(name=name).values_list(
+            'value', flat=True
+        ).first() or ZERO
+        if current == counted:
+            continue
+        if current:
+            DashboardCounter.objects.update_or_create(name=name, defaults={'value': current})
+        else:
+            DashboardCounter.objects.filter(name=name).delete()
+        _bump(DashboardCounter, {'name': OVERDUE_COUNTER}, 'value', current - counted)
+
+
+# Signal hooks. `before` is the row as stored before the save (None for new rows),
+# stashed by the pre_save receiver in `system.signals`, so post_save applies only the
+# difference.
+
+def payment_post_save(payment, before):
+    apply_deltas(_difference(_payment_revenue(payment), _payment_revenue(before)))
+    settle_overdue([payment.order_id, before.order_id if before else None])
+
+
+def payment_post_delete(payment):
+    apply_deltas(_difference({}, _payment_revenue(payment)))
+    settle_overdue([payment.order_id])
+
+
+def order_post_save(order, before):
+    old_status = before.status if before else None
+    if old_status != order.status:
+        deltas = {('counter', ORDER_STATUS_COUNTER.format(order.status)): 1}
+        if old_status is not None:
+            deltas[('counter', ORDER_STATUS_COUNTER.format(old_status))] = -1
+        apply_deltas(deltas)
+
+
+def order_post_delete(order):
+    apply_deltas({('counter', ORDER_STATUS_COUNTER.format(order.status)): -1})
+    settle_overdue([order.pk])
+
+
+def production_post_save(production, before):
+    settle_overdue([production.order_id, before.order_id if before else None])
+
+
+def production_post_delete(production):
+    settle_overdue([production.order_id])
+
+
+# Full recomputation
+
+def compute():
+    """
+    Every rollup value computed from the raw tables, as
+    {('counter', name) | ('day' | 'month', date): amount}.
+    """
+    values = {}
+    paid = Payment.objects.filter(status='PAID')
+    values[('counter', REVENUE_COUNTER)] = paid.aggregate(total=Sum('amount'))['total'] or ZERO
+    for period, trunc in (('day', TruncDate), ('month', TruncMonth)):
+        buckets = (
+            paid.annotate(start=trunc('payment_date', output_field=DateField()))
+            .values('start')
+            .annotate(total=Sum('amount'))
+            .order_by('start')
+        )
+        for bucket in buckets:
+            values[(period, bucket['start'])] = bucket['total']
+
+    overdue = (
+        Payment.objects.filter(
+            status='PENDING',
+            order_id__in=Production.objects.filter(status='COMPLETED').values('order_id'),
+        )
+        .values('order_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    values[('counter', OVERDUE_COUNTER)] = ZERO
+    for row in overdue:
+        if row['total']:
+            values[('counter', OVERDUE_ORDER_COUNTER.format(row['order_id']))] = row['total']
+            values[('counter', OVERDUE_COUNTER)] += row['total']
+
+    for row in Order.objects.values('status').annotate(count=Count('order_id')).order_by():
+        values[('counter', ORDER_STATUS_COUNTER.format(row['status']))] = row['count']
+    return values
+
+
+def stored():
+    values = {('counter', name): value for name, value in DashboardCounter.objects.values_list('name', 'value')}
+    for period, start, total in RevenueBucket.objects.values_list('period', 'start', 'total'):
+        values[(period, start)] = total
+    return values
+
+
+def rebuild():
+    """Replace the stored rollups with a fresh computation from the raw tables."""
+    values = compute()
+    with transaction.atomic():
+        DashboardCounter.objects.all().delete()
+        RevenueBucket.objects.all().delete()
+        DashboardCounter.objects.bulk_create(
+            DashboardCounter(name=key, value=value)
+            for (kind, key), value in values.items() if kind == 'counter'
+        )
+        RevenueBucket.objects.bulk_create(
+            RevenueBucket(period=kind, start=key, total=value)
+            for (kind, key), value in values.items() if kind != 'counter'
+        )
+    return values
+
+
+def check():
+    """Return {key: (stored, expected)} for every rollup that disagrees with the raw tables."""
+    expected, actual = compute(), stored()
+    mismatches = {}
+    for key in expected.keys() | actual.keys():
+        stored_value, expected_value = actual.get(key, 0), expected.get(key, 0)
+        if stored_value != expected_value:
+            mismatches[key] = (stored_value, expected_value)
+    return mismatches
+
+
+# Dashboard reads
+
+def dashboard_totals():
+    """Revenue, overdue and per-status order counts, read from the counters in one query."""
+    counters = dict(DashboardCounter.objects.exclude(
+        name__startswith=OVERDUE_ORDER_COUNTER.format('')
+    ).values_list('name', 'value'))
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+    return {
+        'total_revenue': counters.get(REVENUE_COUNTER, ZERO),
+        'overdue_payments': counters.get(OVERDUE_COUNTER, ZERO),
+        'order_status_counts': [
+            int(counters.get(ORDER_STATUS_COUNTER.format(status), 0)) for status in statuses
+        ],
+        'order_status_labels': [label for _, label in Order.STATUS_CHOICES],
+    }
+
+
+def dashboard_metrics():
+    """
+    Totals, the monthly revenue series and the order status counts for the dashboard,
+    read from the rollup tables in two queries.
+    """
+    metrics = dashboard_totals()
+    metrics['revenue_months'] = list(
+        RevenueBucket.objects.filter(period='month').exclude(total=0).order_by('start').values_list(
+            'start', 'total'
+        )
+    )
+    return metrics
+
+
+def rollups_updated_at():
+    """When any counter or revenue bucket last changed, or None if there are none yet."""
+    timestamps = [
+        DashboardCounter.objects.aggregate(latest=Max('updated_at'))['latest'],
+        RevenueBucket.objects.aggregate(latest=Max('updated_at'))['latest'],
+    ]
+    timestamps = [timestamp for timestamp in timestamps if timestamp]
+    return max(timestamps) if timestamps else None
+
+
+_chart_cache = (None, None)  # (rollups_updated_at, payload)
+
+
+def dashboard_charts(updated_at):
+    """
+    Chart series for the dashboard as a JSON-ready dict. The last payload is kept in
+    memory and reused while `updated_at` (from `rollups_updated_at()`) is unchanged.
+    """
+    global _chart_cache
+    cached_at, payload = _chart_cache
+    if payload is not None and updated_at is not None and cached_at == updated_at:
+        return payload
+
+    metrics = dashboard_metrics()
+    payload = {
+        'revenue_labels': [month.strftime('%b %Y') for month, total in metrics['revenue_months']],
+        'revenue_data': [float(total) for month, total in metrics['revenue_months']],
+        'order_status_labels': metrics['order_status_labels'],
+        'order_status_data': metrics['order_status_counts'],
+    }
+    _chart_cache = (updated_at, payload)
+    return payload
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+QUEUE_GAP = 1024
+
+
+def respace_order_queue(apps, schema_editor):
+    """Turn the dense 1..n queue numbers into ranks spaced QUEUE_GAP apart."""
+    Order = apps.get_model('system', 'Order')
+
+    active_orders = list(
+        Order.objects.filter(status__in=['PENDING', 'IN PROGRESS'])
+        .order_by('order_queue', 'order_id')
+        .only('order_id', 'order_queue')
+    )
+    for index, order in enumerate(active_orders):
+        order.order_queue = (index + 1) * QUEUE_GAP
+    Order.objects.bulk_update(active_orders, ['order_queue'], batch_size=500)
+
+    Order.objects.filter(status__in=['COMPLETED', 'CANCELLED']).update(order_queue=None)
+
+
+def compact_order_queue(apps, schema_editor):
+    Order = apps.get_model('system', 'Order')
+
+    active_orders = list(
+        Order.objects.filter(status__in=['PENDING', 'IN PROGRESS'])
+        .order_by('order_queue', 'order_id')
+        .only('order_id', 'order_queue')
+    )
+    for index, order in enumerate(active_orders):
+        order.order_queue = index + 1
+    Order.objects.bulk_update(active_orders, ['order_queue'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0026_alter_production_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(respace_order_queue, compact_order_queue),
+    ]
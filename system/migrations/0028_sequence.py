@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_order_queue_sequence(apps, schema_editor):
+    """Start the order queue counter at the highest rank currently in use."""
+    Order = apps.get_model('system', 'Order')
+    Sequence = apps.get_model('system', 'Sequence')
+
+    max_rank = Order.objects.filter(
+        status__in=['PENDING', 'IN PROGRESS']
+    ).aggregate(max_rank=Max('order_queue'))['max_rank'] or 0
+    Sequence.objects.create(name='order_queue', value=max_rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0027_respace_order_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_order_queue_sequence, migrations.RunPython.noop),
+    ]
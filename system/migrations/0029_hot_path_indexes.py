@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0028_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('stock_level__lt', models.F('reorder_threshold'))), fields=['name'], name='inventory_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'order_queue'], name='order_status_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-completed_or_cancelled', '-order_id'], name='order_status_archive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'payment_date'], name='payment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='production',
+            index=models.Index(fields=['status', 'priority'], name='production_status_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The search index as it stood when this migration was written. The SQL is kept here
+# rather than imported from system.search, so later changes to the backends do not
+# rewrite history.
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS system_order_search USING fts5("
+    "order_number, customer_name, contact_number, service_name, status, specifications, "
+    "tokenize = 'unicode61')",
+    "DELETE FROM system_order_search",
+    "INSERT INTO system_order_search (rowid, order_number, customer_name, contact_number, "
+    "service_name, status, specifications) "
+    "SELECT o.order_id, CAST(o.order_id AS TEXT), c.name, c.contact_number, s.name, o.status, "
+    "(SELECT group_concat(j.value, ' ') FROM json_tree(o.job_specifications) j "
+    " WHERE j.type IN ('text', 'integer', 'real')) "
+    "FROM system_order o "
+    "JOIN system_customer c ON c.customer_id = o.customer_id "
+    "JOIN system_service s ON s.service_id = o.service_id",
+]
+
+POSTGRESQL_SQL = [
+    "CREATE TABLE IF NOT EXISTS system_order_search ("
+    "order_id integer PRIMARY KEY, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS system_order_search_document_idx "
+    "ON system_order_search USING GIN (document)",
+    "TRUNCATE system_order_search",
+    "INSERT INTO system_order_search (order_id, document) "
+    "SELECT o.order_id, "
+    "setweight(to_tsvector('simple', o.order_id::text), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(c.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(c.contact_number, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') || "
+    "setweight(to_tsvector('simple', o.status), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(o.job_specifications, '{}'::jsonb)), 'D') "
+    "FROM system_order o "
+    "JOIN system_customer c ON c.customer_id = o.customer_id "
+    "JOIN system_service s ON s.service_id = o.service_id",
+]
+
+CREATE_SQL = {'sqlite': SQLITE_SQL, 'postgresql': POSTGRESQL_SQL}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute("DROP TABLE IF EXISTS system_order_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0029_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def build_dashboard_metrics(apps, schema_editor):
+    """
+    Fill the rollups from the raw tables, as system.metrics.rebuild() did when this
+    migration was written: paid revenue in total and per day and month, pending
+    payments of orders whose production is completed, and the order count per status.
+    """
+    Payment = apps.get_model('system', 'Payment')
+    Order = apps.get_model('system', 'Order')
+    Production = apps.get_model('system', 'Production')
+    DashboardCounter = apps.get_model('system', 'DashboardCounter')
+    RevenueBucket = apps.get_model('system', 'RevenueBucket')
+
+    paid = Payment.objects.filter(status='PAID')
+    counters = {'total_revenue': paid.aggregate(total=Sum('amount'))['total'] or 0}
+    buckets = []
+    for period, trunc in (('day', TruncDate), ('month', TruncMonth)):
+        totals = (
+            paid.annotate(start=trunc('payment_date', output_field=DateField()))
+            .values('start')
+            .annotate(total=Sum('amount'))
+            .order_by('start')
+        )
+        buckets += [RevenueBucket(period=period, start=row['start'], total=row['total']) for row in totals]
+
+    overdue = (
+        Payment.objects.filter(
+            status='PENDING',
+            order_id__in=Production.objects.filter(status='COMPLETED').values('order_id'),
+        )
+        .values('order_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    counters['overdue_payments'] = 0
+    for row in overdue:
+        if row['total']:
+            counters[f"overdue_payments:order:{row['order_id']}"] = row['total']
+            counters['overdue_payments'] += row['total']
+
+    for row in Order.objects.values('status').annotate(count=Count('order_id')).order_by():
+        counters[f"orders:{row['status']}"] = row['count']
+
+    DashboardCounter.objects.bulk_create(
+        DashboardCounter(name=name, value=value) for name, value in counters.items()
+    )
+    RevenueBucket.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0030_order_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RevenueBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'start'), name='revenue_bucket_period_start_uniq')],
+            },
+        ),
+        migrations.RunPython(build_dashboard_metrics, migrations.RunPython.noop),
+    ]
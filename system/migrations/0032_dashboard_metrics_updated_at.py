@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0031_dashboard_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardcounter',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='revenuebucket',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def build_customer_stats(apps, schema_editor):
+    """
+    Fill the new totals from the raw tables, as system.customer_stats.rebuild() did
+    when this migration was written. FAILED and REFUNDED payments are not billed.
+    """
+    Customer = apps.get_model('system', 'Customer')
+    Order = apps.get_model('system', 'Order')
+    Payment = apps.get_model('system', 'Payment')
+
+    stats = {}
+    payment_totals = Payment.objects.exclude(status__in=['FAILED', 'REFUNDED']).values('order__customer_id').annotate(
+        billed=Sum('amount'),
+        paid=Sum('amount', filter=Q(status='PAID')),
+        partially_paid=Sum('amount_paid', filter=Q(status='PARTIALLY_PAID')),
+    ).order_by()
+    for row in payment_totals:
+        billed = row['billed'] or 0
+        paid = (row['paid'] or 0) + (row['partially_paid'] or 0)
+        stats.setdefault(row['order__customer_id'], {}).update(
+            total_billed=billed, total_paid=paid, outstanding_balance=billed - paid,
+        )
+    order_totals = Order.objects.values('customer_id').annotate(
+        count=Count('order_id'), latest=Max('created_at'),
+    ).order_by()
+    for row in order_totals:
+        stats.setdefault(row['customer_id'], {}).update(order_count=row['count'], last_order_at=row['latest'])
+
+    customers = list(Customer.objects.filter(pk__in=stats).only('pk'))
+    for customer in customers:
+        for field, value in stats[customer.pk].items():
+            setattr(customer, field, value)
+    Customer.objects.bulk_update(
+        customers,
+        ['total_billed', 'total_paid', 'outstanding_balance', 'order_count', 'last_order_at'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0032_dashboard_metrics_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_order_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='outstanding_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_billed',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-total_paid'], name='customer_total_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-outstanding_balance'], name='customer_outstanding_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_order_at'], name='customer_last_order_idx'),
+        ),
+        migrations.RunPython(build_customer_stats, migrations.RunPython.noop),
+    ]
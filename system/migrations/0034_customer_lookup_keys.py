@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+import re
+
+from django.db import migrations, models
+
+
+# Copies of system.models.normalize_customer_name / normalize_phone as they stood
+# when this migration was written.
+def normalize_customer_name(name):
+    return ' '.join(re.findall(r'\w+', (name or '').lower()))
+
+
+def normalize_phone(number):
+    return re.sub(r'\D', '', number or '')[-10:]
+
+
+def fill_lookup_keys(apps, schema_editor):
+    Customer = apps.get_model('system', 'Customer')
+
+    customers = list(Customer.objects.only('customer_id', 'name', 'contact_number'))
+    for customer in customers:
+        customer.name_key = normalize_customer_name(customer.name)
+        customer.phone_key = normalize_phone(customer.contact_number)
+    Customer.objects.bulk_update(customers, ['name_key', 'phone_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0033_customer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(fill_lookup_keys, migrations.RunPython.noop),
+    ]
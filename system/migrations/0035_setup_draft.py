@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0034_customer_lookup_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SetupDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('draft_key', models.CharField(max_length=32)),
+                ('section', models.CharField(choices=[('business_details', 'Business Details'), ('service', 'Service'), ('equipment', 'Equipment'), ('material', 'Material'), ('supplier', 'Supplier'), ('customer', 'Customer'), ('system_settings', 'System Settings')], max_length=20)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('draft_key', 'section', 'position'), name='setup_draft_entry_uniq')],
+            },
+        ),
+    ]
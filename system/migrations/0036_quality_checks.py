@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+RESULTS = {'on_progress', 'pass', 'fail'}
+
+
+def copy_checks_to_rows(apps, schema_editor):
+    Production = apps.get_model('system', 'Production')
+    QualityCheck = apps.get_model('system', 'QualityCheck')
+
+    rows = []
+    for job_id, checks in Production.objects.values_list('job_id', 'quality_checks').iterator():
+        # A later entry for the same parameter replaced the earlier one in the old views.
+        by_parameter = {}
+        for check in checks or []:
+            if isinstance(check, dict) and check.get('parameter'):
+                by_parameter[str(check['parameter'])] = check
+        rows.extend(
+            QualityCheck(
+                job_id=job_id,
+                parameter=parameter[:255],
+                # The JSON field took any result; keep only the ones the column allows.
+                result=check.get('result') if check.get('result') in RESULTS else 'on_progress',
+                notes=str(check.get('notes') or ''),
+            )
+            for parameter, check in by_parameter.items()
+        )
+        if len(rows) >= 500:
+            QualityCheck.objects.bulk_create(rows)
+            rows = []
+    QualityCheck.objects.bulk_create(rows)
+
+
+def copy_rows_to_checks(apps, schema_editor):
+    Production = apps.get_model('system', 'Production')
+    QualityCheck = apps.get_model('system', 'QualityCheck')
+
+    checks = {}
+    for job_id, parameter, result, notes in QualityCheck.objects.order_by('id').values_list(
+        'job_id', 'parameter', 'result', 'notes'
+    ):
+        checks.setdefault(job_id, []).append({'parameter': parameter, 'result': result, 'notes': notes})
+    jobs = list(Production.objects.only('job_id'))
+    for job in jobs:
+        job.quality_checks = checks.get(job.job_id, [])
+    Production.objects.bulk_update(jobs, ['quality_checks'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0035_setup_draft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QualityCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parameter', models.CharField(max_length=255)),
+                ('result', models.CharField(choices=[('on_progress', 'On Progress'), ('pass', 'Pass'), ('fail', 'Fail')], default='on_progress', max_length=20)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checks', to='system.production')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['result', 'parameter'], name='quality_check_result_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'parameter'), name='quality_check_job_parameter_uniq')],
+            },
+        ),
+        migrations.RunPython(copy_checks_to_rows, copy_rows_to_checks),
+        migrations.AlterField(
+            model_name='production',
+            name='quality_checks',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RemoveField(
+            model_name='production',
+            name='quality_checks',
+        ),
+    ]
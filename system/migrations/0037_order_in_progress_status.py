@@ -0,0 +1,88 @@
+from django.db import migrations
+from django.db.models import Max
+
+QUEUE_GAP = 1024
+BATCH_SIZE = 500
+
+# The search documents of the fixed orders are rebuilt from the live tables, as in
+# 0030; `.update()` sends no signals, so system.signals does not refresh them.
+SEARCH_SQL = {
+    'sqlite': [
+        "DELETE FROM system_order_search WHERE rowid IN ({ids})",
+        "INSERT INTO system_order_search (rowid, order_number, customer_name, contact_number, "
+        "service_name, status, specifications) "
+        "SELECT o.order_id, CAST(o.order_id AS TEXT), c.name, c.contact_number, s.name, o.status, "
+        "(SELECT group_concat(j.value, ' ') FROM json_tree(o.job_specifications) j "
+        " WHERE j.type IN ('text', 'integer', 'real')) "
+        "FROM system_order o "
+        "JOIN system_customer c ON c.customer_id = o.customer_id "
+        "JOIN system_service s ON s.service_id = o.service_id "
+        "WHERE o.order_id IN ({ids})",
+    ],
+    'postgresql': [
+        "INSERT INTO system_order_search (order_id, document) "
+        "SELECT o.order_id, "
+        "setweight(to_tsvector('simple', o.order_id::text), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(c.name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(c.contact_number, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') || "
+        "setweight(to_tsvector('simple', o.status), 'C') || "
+        "setweight(to_tsvector('simple', coalesce(o.job_specifications, '{{}}'::jsonb)), 'D') "
+        "FROM system_order o "
+        "JOIN system_customer c ON c.customer_id = o.customer_id "
+        "JOIN system_service s ON s.service_id = o.service_id "
+        "WHERE o.order_id IN ({ids}) "
+        "ON CONFLICT (order_id) DO UPDATE SET document = EXCLUDED.document",
+    ],
+}
+
+
+def fix_in_progress_orders(apps, schema_editor):
+    """
+    submit_production stored the production status 'IN_PROGRESS' on the order instead
+    of 'IN PROGRESS', which left those orders out of the queue. Put them back and
+    respace the queue so they keep the place they held.
+    """
+    Order = apps.get_model('system', 'Order')
+    Sequence = apps.get_model('system', 'Sequence')
+    DashboardCounter = apps.get_model('system', 'DashboardCounter')
+
+    fixed_ids = list(Order.objects.filter(status='IN_PROGRESS').values_list('order_id', flat=True))
+    if not fixed_ids:
+        return
+    Order.objects.filter(status='IN_PROGRESS').update(status='IN PROGRESS')
+
+    for start in range(0, len(fixed_ids), BATCH_SIZE):
+        batch = fixed_ids[start:start + BATCH_SIZE]
+        for sql in SEARCH_SQL.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql.format(ids=', '.join(['%s'] * len(batch))), batch)
+
+    active_orders = list(
+        Order.objects.filter(status__in=['PENDING', 'IN PROGRESS'])
+        .order_by('order_queue', 'order_id')
+        .only('order_id', 'order_queue')
+    )
+    for index, order in enumerate(active_orders):
+        order.order_queue = (index + 1) * QUEUE_GAP
+    Order.objects.bulk_update(active_orders, ['order_queue'], batch_size=500)
+    max_rank = Order.objects.aggregate(max_rank=Max('order_queue'))['max_rank'] or 0
+    Sequence.objects.update_or_create(name='order_queue', defaults={'value': max_rank})
+
+    # The per-status dashboard counters were kept under the wrong status too.
+    stray = DashboardCounter.objects.filter(name='orders:IN_PROGRESS').first()
+    if stray is not None:
+        counter, _ = DashboardCounter.objects.get_or_create(name='orders:IN PROGRESS')
+        counter.value += stray.value
+        counter.save()
+        stray.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0036_quality_checks'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_in_progress_orders, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,101 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Func, OuterRef, Prefetch, Q, Subquery
 import json
 from decimal import Decimal
 from django.utils.timezone import make_aware
+import re
+from django.core.serializers.json import DjangoJSONEncoder
+
+def normalize_customer_name(name):
+    """'Dela Cruz,  Juan P.' -> 'dela cruz juan p': lowercase words, punctuation dropped."""
+    return ' '.join(re.findall(r'\w+', (name or '').lower()))
+
+def normalize_phone(number):
+    """Digits only, last 10 kept, so '+63 917-123-4567' and '09171234567' match."""
+    return re.sub(r'\D', '', number or '')[-10:]
+
+def prefix_range(prefix):
+    """(gte, lt) bounds matching strings that start with `prefix`, for an index range scan."""
+    return prefix, prefix + '\uffff'
+
+class CustomerQuerySet(models.QuerySet):
+    def search(self, query):
+        """Customers whose name contains `query`; a blank query matches everyone."""
+        query = (query or '').strip()
+        return self.filter(name__icontains=query) if query else self
+
+    def with_history_preview(self, limit=5):
+        """
+        Prefetch each customer's `limit` most recent orders (with service and payments)
+        into `recent_orders`, and annotate `payment_count`, the customer's payments on
+        all orders. However many customers are listed, the whole history preview costs
+        two queries.
+        """
+        recent_orders = Order.objects.select_related('service').prefetch_related(
+            Prefetch('payments', queryset=Payment.objects.order_by('-payment_date'))
+        ).order_by('-created_at', '-order_id')
+        payment_count = Payment.objects.filter(order__customer=OuterRef('pk')).order_by().annotate(
+            count=Func(F('payment_id'), function='COUNT')
+        ).values('count')
+        return self.annotate(payment_count=Subquery(payment_count)).prefetch_related(
+            Prefetch('orders', queryset=recent_orders[:limit], to_attr='recent_orders')
+        )
+
+    def autocomplete(self, query, limit=10):
+        """
+        Customers whose normalized name (or, for a number, phone) starts with `query`.
+        Both are range scans on an indexed key column, never a table scan.
+        """
+        query = query or ''
+        if re.search(r'\d', query) and not re.search(r'[^\d\s()+-]', query):
+            # A typed number is a prefix of the full one: drop the trunk 0 / +63 that
+            # normalize_phone() cuts off the stored key.
+            # Nothing left (e.g. '0' or '63') would match every customer.
+            prefix = re.sub(r'^(?:63|0)', '', re.sub(r'\D', '', query))
+            if not prefix:
+                return self.none()
+            lower, upper = prefix_range(prefix)
+            matches = self.filter(phone_key__gte=lower, phone_key__lt=upper).order_by('phone_key')
+        else:
+            name = normalize_customer_name(query)
+            if not name:
+                return self.none()
+            lower, upper = prefix_range(name)
+            matches = self.filter(name_key__gte=lower, name_key__lt=upper).order_by('name_key')
+        return matches[:limit]
+
+    def find_existing(self, name, contact_number=''):
+        """
+        The customer an intake form refers to: same normalized name, preferring the one
+        with the same phone number. A customer whose phone differs from the one given is
+        someone else with the same name; a missing phone on either side matches. None if
+        there is no such customer.
+        """
+        candidates = list(self.filter(name_key=normalize_customer_name(name)).order_by('customer_id')[:20])
+        phone = normalize_phone(contact_number)
+        for candidate in candidates:
+            if phone and candidate.phone_key == phone:
+                return candidate
+        for candidate in candidates:
+            if not phone or not candidate.phone_key:
+                return candidate
+        return None
+
+    def top_spenders(self):
+        return self.filter(total_paid__gt=0).order_by('-total_paid')
+
+    def with_outstanding_balance(self):
+        return self.filter(outstanding_balance__gt=0).order_by('-outstanding_balance')
+
+    def dormant(self, since):
+        """
+        Customers whose last order is older than `since` or who never ordered,
+        longest-idle first.
+        """
+        return self.filter(Q(last_order_at__lt=since) | Q(last_order_at__isnull=True)).order_by(
+            F('last_order_at').asc(nulls_first=True)
+        )
 
 class Customer(models.Model):
     customer_id = models.AutoField(primary_key=True)
@@ -10,6 +104,45 @@ class Customer(models.Model):
     email = models.EmailField(null=True, blank=True)
     address = models.TextField(null=True, blank=True)
 
+    # Lookup keys for intake deduplication and autocomplete, derived from name and
+    # contact_number on save (see normalize_customer_name / normalize_phone).
+    name_key = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    phone_key = models.CharField(max_length=15, db_index=True, editable=False, default='')
+
+    # Lifetime totals, maintained by system.customer_stats from Order and Payment changes.
+    total_billed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    outstanding_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+
+    STATS_FIELDS = ('total_billed', 'total_paid', 'outstanding_balance', 'order_count', 'last_order_at')
+
+    objects = CustomerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_paid'], name='customer_total_paid_idx'),
+            models.Index(fields=['-outstanding_balance'], name='customer_outstanding_idx'),
+            models.Index(fields=['last_order_at'], name='customer_last_order_idx'),
+        ]
+
+    def refresh_lookup_keys(self):
+        """Recompute the lookup keys; bulk_create callers must call this themselves."""
+        self.name_key = normalize_customer_name(self.name)
+        self.phone_key = normalize_phone(self.contact_number)
+
+    def save(self, *args, **kwargs):
+        self.refresh_lookup_keys()
+        # The totals are written only by system.customer_stats; saving a customer loaded
+        # earlier must not put back the values it was loaded with.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.STATS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
     
@@ -18,6 +151,15 @@ class Customer(models.Model):
 
     def get_payment_history(self):
         return Payment.objects.filter(order__customer=self)
+
+    def get_recent_payments(self):
+        """Payments on the prefetched `recent_orders` (see `with_history_preview`), newest first."""
+        payments = [payment for order in self.recent_orders for payment in order.payments.all()]
+        return sorted(payments, key=lambda payment: payment.payment_date, reverse=True)
+
+    def has_more_payments(self):
+        """Whether `payment_count` covers payments beyond `get_recent_payments()`."""
+        return self.payment_count > sum(len(order.payments.all()) for order in self.recent_orders)
     
 class Service(models.Model):
     service_id = models.AutoField(primary_key=True)
@@ -36,7 +178,9 @@ class Service(models.Model):
         Returns:
             dict: A dictionary where keys are customization options, and values are lists of pricing options.
         """
-        pricing_options = self.pricing_options.select_related('customization_option')
+        pricing_options = self.pricing_options.all()
+        if 'pricing_options' not in getattr(self, '_prefetched_objects_cache', {}):
+            pricing_options = pricing_options.select_related('customization_option')
         organized_options = {}
 
         for pricing_option in pricing_options:
@@ -69,12 +213,62 @@ class PricingOption(models.Model):
     def __str__(self):
         return f"{self.service.name} - {self.customization_option.name}: {self.description} (Price: {self.price} pesos)"
 
+def discount_amount(amount, discount, discount_type):
+    """Amount taken off `amount` by a 'percentage' or 'fixed' discount (0 for no discount)."""
+    if discount_type == 'percentage':
+        return (discount / 100) * amount
+    if discount_type == 'fixed':
+        return discount
+    return 0
+
 def decimal_to_float(obj):
     """Helper function to convert Decimal to float for JSON serialization."""
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
+class OrderQuerySet(models.QuerySet):
+    # Columns rendered by the order list partials (queue, archive, search results).
+    LIST_FIELDS = (
+        'order_id', 'order_queue', 'status', 'deadline', 'created_at',
+        'completed_or_cancelled', 'job_specifications',
+        'customer__name', 'service__name',
+    )
+
+    def for_listing(self):
+        """Load the customer and service names in the same query, and only the listed columns."""
+        return self.select_related('customer', 'service').only(*self.LIST_FIELDS)
+
+    def queue(self):
+        """Pending and in-progress orders in queue order, with their display position."""
+        return (
+            self.filter(status__in=Order.ACTIVE_STATUSES)
+            .for_listing()
+            .with_queue_position()
+            .order_by('order_queue')
+        )
+
+    def archive(self):
+        """Completed and cancelled orders, most recently closed first."""
+        return self.filter(status__in=Order.ARCHIVED_STATUSES).for_listing().order_by(
+            F('completed_or_cancelled').desc(nulls_last=True), '-order_id'
+        )
+
+    def with_queue_position(self):
+        """
+        Annotate `queue_position`, the 1-based place of each active order in the queue.
+        `order_queue` holds sparse ranks, so the position is counted at read time.
+        Orders outside the queue get 0.
+        """
+        ahead = Order.objects.filter(
+            status__in=Order.ACTIVE_STATUSES,
+            order_queue__lte=OuterRef('order_queue'),
+        ).order_by().annotate(
+            position=Func(F('order_id'), function='COUNT')
+        ).values('position')
+        return self.annotate(queue_position=Subquery(ahead))
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -82,6 +276,8 @@ class Order(models.Model):
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
     ]
+    ACTIVE_STATUSES = ['PENDING', 'IN PROGRESS']  # Orders that hold a place in the queue
+    ARCHIVED_STATUSES = ['COMPLETED', 'CANCELLED']
 
     order_id = models.AutoField(primary_key=True)
     order_queue = models.IntegerField(blank=True, null=True)
@@ -94,6 +290,20 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_or_cancelled = models.DateTimeField(null=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Order.objects.queue() and the queue position subquery. Composite rather than
+            # partial: SQLite cannot match a partial index against a parameterised status.
+            models.Index(fields=['status', 'order_queue'], name='order_status_queue_idx'),
+            # Order.objects.archive() keyset pagination
+            models.Index(
+                fields=['status', '-completed_or_cancelled', '-order_id'], name='order_status_archive_idx',
+            ),
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if isinstance(self.job_specifications, dict):
             self.job_specifications = json.loads(
@@ -141,16 +351,14 @@ class Payment(models.Model):
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='PENDING')
     payment_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'payment_date'], name='payment_status_date_idx'),
+        ]
+
     def get_final_price(self):
         """Calculate the final price after applying the discount."""
-        if self.discount_type == 'percentage':
-            discount_amount = (self.discount / 100) * self.amount
-        elif self.discount_type == 'fixed':
-            discount_amount = self.discount
-        else:
-            discount_amount = 0
-
-        return max(self.amount - discount_amount, 0)
+        return max(self.amount - discount_amount(self.amount, self.discount, self.discount_type), 0)
 
     def __str__(self):
         final_price = self.get_final_price()
@@ -230,6 +438,15 @@ class Inventory(models.Model):
         default="qty",
     )
 
+    class Meta:
+        indexes = [
+            # Low-stock alerts: stock_level < reorder_threshold
+            models.Index(
+                fields=['name'], name='inventory_low_stock_idx',
+                condition=models.Q(stock_level__lt=models.F('reorder_threshold')),
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -244,7 +461,6 @@ class Production(models.Model):
     order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="productions")
     materials = models.ManyToManyField("Inventory", related_name="productions")
     equipment_assigned = models.JSONField()
-    quality_checks = models.JSONField()
     status = models.CharField(
         max_length=50,
         choices=[
@@ -261,9 +477,108 @@ class Production(models.Model):
         default='MODERATE'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority'], name='production_status_priority_idx'),
+        ]
+
     def __str__(self):
         return f"Production Job {self.job_id} - {self.get_status_display()}"
 
+class QualityCheckQuerySet(models.QuerySet):
+    def for_job(self, job_id):
+        """The job's checks as dicts, in the order they were first recorded."""
+        return self.filter(job_id=job_id).order_by('id').values('parameter', 'result', 'notes')
+
+    def upsert(self, job_id, parameter, result, notes, new_parameter=None):
+        """
+        Record the result of `parameter` on a job, replacing an earlier one; `new_parameter`
+        renames the check. Returns (check, created).
+
+        Raises ValidationError with code 'invalid_choice' for an unknown result, and
+        with code 'unique' when the job already has a check named `new_parameter`.
+        """
+        if result not in dict(QualityCheck.RESULT_CHOICES):
+            raise ValidationError(f"Unknown result {result!r}.", code='invalid_choice')
+        try:
+            with transaction.atomic():
+                return self.update_or_create(
+                    job_id=job_id, parameter=parameter,
+                    defaults={'parameter': new_parameter or parameter, 'result': result, 'notes': notes or ''},
+                )
+        except IntegrityError:
+            raise ValidationError(
+                f"This job already has a check named {new_parameter or parameter!r}.", code='unique'
+            )
+
+    def build(self, entries):
+        """
+        Unsaved checks from submitted {'parameter', 'result', 'notes'} objects; a later
+        entry for the same parameter replaces an earlier one. Set `job` before saving.
+
+        Raises ValidationError with code 'invalid' for an entry that is not an object
+        with a parameter name, and with code 'invalid_choice' for an unknown result.
+        """
+        if not isinstance(entries, list):
+            raise ValidationError("Quality checks must be a list.", code='invalid')
+        checks = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValidationError(f"Not a quality check: {entry!r}.", code='invalid')
+            parameter, notes = entry.get('parameter'), entry.get('notes') or ''
+            if not isinstance(parameter, str) or not parameter.strip() or len(parameter) > 255:
+                raise ValidationError(f"Invalid parameter {parameter!r}.", code='invalid')
+            if not isinstance(notes, str):
+                raise ValidationError(f"Invalid notes for {parameter!r}.", code='invalid')
+            result = entry.get('result') or 'on_progress'
+            if result not in dict(QualityCheck.RESULT_CHOICES):
+                raise ValidationError(f"Unknown result {result!r}.", code='invalid_choice')
+            checks[parameter] = QualityCheck(parameter=parameter, result=result, notes=notes)
+        return list(checks.values())
+
+    def fail_rates(self, *group_by):
+        """
+        Checks, failures and the fail rate (0-1) per value of `group_by`, e.g.
+        fail_rates('parameter') or fail_rates('job__order__service__name').
+        """
+        return (
+            self.values(*group_by)
+            .annotate(
+                total=models.Count('id'),
+                failed=models.Count('id', filter=models.Q(result='fail')),
+            )
+            .annotate(fail_rate=models.ExpressionWrapper(
+                models.F('failed') * 1.0 / models.F('total'), output_field=models.FloatField()
+            ))
+            .order_by('-fail_rate', *group_by)
+        )
+
+class QualityCheck(models.Model):
+    RESULT_CHOICES = [
+        ('on_progress', 'On Progress'),
+        ('pass', 'Pass'),
+        ('fail', 'Fail'),
+    ]
+
+    job = models.ForeignKey(Production, on_delete=models.CASCADE, related_name='checks')
+    parameter = models.CharField(max_length=255)
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES, default='on_progress')
+    notes = models.TextField(blank=True, default='')
+    checked_at = models.DateTimeField(auto_now=True)
+
+    objects = QualityCheckQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'parameter'], name='quality_check_job_parameter_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['result', 'parameter'], name='quality_check_result_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} - {self.parameter}: {self.get_result_display()}"
+
     
 class Supplier(models.Model):
     supplier_name = models.CharField(max_length=255)
@@ -307,4 +622,91 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"{self.action} at {self.timestamp}"
-    
+
+class Sequence(models.Model):
+    """
+    Named counter for values that must be unique under concurrent inserts (e.g. the order
+    queue). Works the same on SQLite and PostgreSQL: the increment is a single atomic
+    UPDATE, which holds the row lock until the surrounding transaction ends.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def next_value(cls, name, step=1):
+        """Increment the named counter by `step` and return the new value."""
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(value=F('value') + step):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(value=F('value') + step)
+            return cls.objects.values_list('value', flat=True).get(name=name)
+
+    @classmethod
+    def reset(cls, name, value):
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+
+class DashboardCounter(models.Model):
+    """
+    Running dashboard total (revenue, overdue payments, orders per status), kept up to
+    date by the signal receivers in `system.metrics`.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+class RevenueBucket(models.Model):
+    """Paid revenue per day or per month, kept up to date by `system.metrics`."""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'start'], name='revenue_bucket_period_start_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_period_display()} {self.start}: {self.total}"
+
+class SetupDraft(models.Model):
+    """
+    One staged entry of the setup wizard, kept until save_to_database writes the real
+    rows. List sections (services, equipment, materials, suppliers, customers) get a
+    row per entry; business details and system settings are a single row at position 0.
+    See `system.setup_draft.SetupDraftStore`.
+    """
+    SECTION_CHOICES = [
+        ('business_details', 'Business Details'),
+        ('service', 'Service'),
+        ('equipment', 'Equipment'),
+        ('material', 'Material'),
+        ('supplier', 'Supplier'),
+        ('customer', 'Customer'),
+        ('system_settings', 'System Settings'),
+    ]
+
+    draft_key = models.CharField(max_length=32)
+    section = models.CharField(max_length=20, choices=SECTION_CHOICES)
+    position = models.PositiveIntegerField(default=0)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['draft_key', 'section', 'position'], name='setup_draft_entry_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_section_display()} #{self.position} ({self.draft_key})"
@@ -0,0 +1,85 @@
+from django.db import transaction
+from .models import Order, Sequence
+
+ACTIVE_STATUSES = Order.ACTIVE_STATUSES
+
+# `Order.order_queue` holds a sparse rank, not the number shown to users. Ranks are
+# spaced QUEUE_GAP apart so cancelling, completing or appending an order touches only
+# that order's row; the visible position is computed at read time by
+# `Order.objects.with_queue_position()`.
+QUEUE_GAP = 1024
+MAX_RANK = 2**31 - 1  # IntegerField upper bound
+ORDER_QUEUE_SEQUENCE = 'order_queue'
+
+
+def next_queue_rank():
+    """
+    Rank for an order joining the end of the queue. Ranks come from the `order_queue`
+    Sequence, so concurrent intakes never get the same number.
+    """
+    rank = Sequence.next_value(ORDER_QUEUE_SEQUENCE, step=QUEUE_GAP)
+    if rank > MAX_RANK:
+        rebalance_queue()
+        rank = Sequence.next_value(ORDER_QUEUE_SEQUENCE, step=QUEUE_GAP)
+    return rank
+
+
+def leave_queue(order):
+    """
+    Take a cancelled or completed order out of the queue. The orders behind it keep
+    their ranks, so nothing else is rewritten.
+    """
+    order.order_queue = None
+
+
+class QueueConflict(Exception):
+    """Raised when the queue changed after the operator loaded the page being reordered."""
+
+
+@transaction.atomic
+def reorder_queue(order_ids, seen_ranks):
+    """
+    Re-rank the given orders in the order listed, reusing the ranks they already hold,
+    with a single bulk UPDATE. Orders outside the list keep their place.
+
+    `seen_ranks` are the ranks the operator's page showed for the same orders. The rows
+    are locked and compared against them first, so a concurrent reorder or cancel
+    raises QueueConflict instead of being silently overwritten.
+    """
+    order_ids = [int(order_id) for order_id in order_ids]
+    seen_ranks = dict(zip(order_ids, (int(rank) for rank in seen_ranks)))
+
+    orders = Order.objects.select_for_update().filter(
+        status__in=ACTIVE_STATUSES, order_queue__isnull=False
+    ).only('order_id', 'order_queue').in_bulk(order_ids)
+
+    if len(orders) != len(order_ids) or any(
+        orders[order_id].order_queue != seen_ranks.get(order_id) for order_id in order_ids
+    ):
+        raise QueueConflict("The order queue was changed by someone else.")
+
+    ranks = sorted(order.order_queue for order in orders.values())
+    listed = [orders[order_id] for order_id in order_ids]
+    for rank, order in zip(ranks, listed):
+        order.order_queue = rank
+    Order.objects.bulk_update(listed, ['order_queue'])
+
+
+@transaction.atomic
+def rebalance_queue():
+    """
+    Respace every active order QUEUE_GAP apart, keeping the current order. Only needed
+    when the ranks run out of room; returns the highest rank after respacing.
+    """
+    active_orders = list(
+        Order.objects.select_for_update()
+        .filter(status__in=ACTIVE_STATUSES)
+        .order_by('order_queue', 'order_id')
+        .only('order_id', 'order_queue')
+    )
+    for index, order in enumerate(active_orders):
+        order.order_queue = (index + 1) * QUEUE_GAP
+    Order.objects.bulk_update(active_orders, ['order_queue'], batch_size=500)
+    Sequence.reset(ORDER_QUEUE_SEQUENCE, len(active_orders) * QUEUE_GAP)
+    return len(active_orders) * QUEUE_GAP
+
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from django.db.models import F, Q
+
+
+class CursorPage:
+    """
+    One page of the order archive. Unlike a Paginator page it has no page number or
+    total count; it links to its neighbours through opaque cursor tokens.
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(direction, order):
+    """Token pointing just past `order`, towards older ('next') or newer ('prev') orders."""
+    timestamp = order.completed_or_cancelled.isoformat() if order.completed_or_cancelled else None
+    payload = json.dumps([direction, timestamp, order.order_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, timestamp, order_id), or None for a missing or tampered token."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, timestamp, order_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            return None
+        timestamp = datetime.fromisoformat(timestamp) if timestamp else None
+        return direction, timestamp, int(order_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def paginate_archive(queryset, cursor=None, per_page=10):
+    """
+    Keyset pagination over `Order.objects.archive()`, newest first, keyed on
+    (completed_or_cancelled, order_id). Each page is a range scan from the cursor
+    instead of COUNT(*) plus OFFSET, so page N costs the same as page 1. Orders
+    archived without a timestamp sort last.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded is None:
+        direction, timestamp, order_id = 'next', None, None
+    else:
+        direction, timestamp, order_id = decoded
+
+    if direction == 'next':
+        ordering = (F('completed_or_cancelled').desc(nulls_last=True), '-order_id')
+        if order_id is None:
+            keyset = Q()
+        elif timestamp is None:
+            keyset = Q(completed_or_cancelled__isnull=True, order_id__lt=order_id)
+        else:
+            keyset = (
+                Q(completed_or_cancelled__lt=timestamp) |
+                Q(completed_or_cancelled=timestamp, order_id__lt=order_id) |
+                Q(completed_or_cancelled__isnull=True)
+            )
+    else:
+        ordering = (F('completed_or_cancelled').asc(nulls_first=True), 'order_id')
+        if timestamp is None:
+            keyset = (
+                Q(completed_or_cancelled__isnull=False) |
+                Q(completed_or_cancelled__isnull=True, order_id__gt=order_id)
+            )
+        else:
+            keyset = (
+                Q(completed_or_cancelled__gt=timestamp) |
+                Q(completed_or_cancelled=timestamp, order_id__gt=order_id)
+            )
+
+    rows = list(queryset.filter(keyset).order_by(*ordering)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'next':
+        has_next, has_previous = has_more, order_id is not None
+    else:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+
+    return CursorPage(
+        rows,
+        next_cursor=encode_cursor('next', rows[-1]) if rows and has_next else None,
+        previous_cursor=encode_cursor('prev', rows[0]) if rows and has_previous else None,
+    )
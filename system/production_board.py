@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from .fragments import FRAGMENT_TIMEOUT, generations
+from .models import Equipment, Order
+
+# Data for the production page: the order queue, and the equipment and staff pickers
+# from the cache, keyed on the fragment generations of Equipment and User (bumped by
+# the receivers in `system.signals` and by the setup import).
+LOOKUPS_CACHE_KEY = 'production_board:lookups:{equipment}:{user}'
+
+
+def board_lookups():
+    """{'equipment_list': [...], 'staff_list': [...]} for the job scheduling form."""
+    current = generations(Equipment, User)
+    key = LOOKUPS_CACHE_KEY.format(**current)
+
+    def compute():
+        return {
+            'equipment_list': list(Equipment.objects.order_by('name').values('equipment_id', 'name')),
+            'staff_list': list(User.objects.filter(is_active=True).order_by('first_name').values('first_name')),
+        }
+
+    return cache.get_or_set(key, compute, FRAGMENT_TIMEOUT)
+
+
+def production_board():
+    """Context for production.html; the queue is left lazy until the template renders it."""
+    return {
+        'orders': Order.objects.queue(),
+        **board_lookups(),
+    }
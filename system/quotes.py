@@ -0,0 +1,161 @@
+import threading
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from .catalogue import catalogue_version, get_catalogue
+from .models import Payment, discount_amount
+
+CENT = Decimal('0.01')
+MAX_BATCH_SIZE = 500
+MAX_LINE_ITEMS = 100
+MAX_QUANTITY = 1_000_000
+
+
+class QuoteError(ValueError):
+    """Raised for a quote request that names unknown options or invalid amounts."""
+
+
+class MalformedQuote(QuoteError):
+    """Raised for a quote request that is not shaped like one; fails the whole batch."""
+
+
+class PriceTable:
+    """
+    Flat {service_id: {pricing_option_id: (customization name, description, price)}}
+    lookup, precomputed from one catalogue version so quoting never touches the database.
+    """
+    def __init__(self, catalogue):
+        self.version = catalogue['version']
+        self.services = {}
+        for service in catalogue['services']:
+            options = {}
+            for customization in service['customizations']:
+                for option in customization['pricing_options']:
+                    options[option['id']] = (customization['name'], option['description'], Decimal(option['price']))
+            self.services[service['id']] = (service['name'], options)
+
+
+_lock = threading.Lock()
+_table = None
+
+
+def get_price_table(version=None):
+    """The price table for the current catalogue version, rebuilt only when it moves."""
+    global _table
+    version = catalogue_version() if version is None else version
+    table = _table
+    if table is None or table.version != version:
+        with _lock:
+            if _table is None or _table.version != version:
+                _table = PriceTable(get_catalogue(version))
+            table = _table
+    return table
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _decimal(value, field):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise QuoteError(f"{field} must be a number.")
+    if not number.is_finite() or number < 0:
+        raise QuoteError(f"{field} must be a non-negative number.")
+    return number
+
+
+def _quantity(value):
+    quantity = _decimal(value, 'quantity')
+    if quantity != quantity.to_integral_value() or quantity > MAX_QUANTITY:
+        raise QuoteError(f"quantity must be a whole number from 0 to {MAX_QUANTITY}.")
+    return quantity.quantize(Decimal('1'))
+
+
+def quote(table, service_id, items, discount=None, discount_type=None):
+    """
+    Price `items` ([{'pricing_option_id', 'quantity'}]) for one service.
+
+    Lines keep the order they were given in and are rounded to the centavo; the discount
+    is applied to the subtotal with the same rules as Payment.get_final_price().
+    """
+    try:
+        service_name, options = table.services[int(service_id)]
+    except (KeyError, TypeError, ValueError):
+        raise QuoteError(f"Unknown service {service_id!r}.")
+    if not isinstance(items, list):
+        raise MalformedQuote("items must be a list.")
+    if not items:
+        raise QuoteError("A quote needs at least one pricing option.")
+    if len(items) > MAX_LINE_ITEMS:
+        raise QuoteError(f"A quote can have at most {MAX_LINE_ITEMS} line items.")
+
+    lines = []
+    subtotal = Decimal('0')
+    for item in items:
+        if not isinstance(item, dict):
+            raise MalformedQuote("Each item must be an object.")
+        try:
+            option_id = int(item['pricing_option_id'])
+            customization, description, price = options[option_id]
+        except (KeyError, TypeError, ValueError):
+            raise QuoteError(f"Pricing option {item.get('pricing_option_id')!r} is not offered for {service_name}.")
+        quantity = _quantity(item.get('quantity', 1))
+        line_total = _money(price * quantity)
+        subtotal += line_total
+        lines.append({
+            'pricing_option_id': option_id,
+            'customization': customization,
+            'description': description,
+            'unit_price': str(price),
+            'quantity': str(quantity),
+            'line_total': str(line_total),
+        })
+
+    valid_types = dict(Payment.DISCOUNT_TYPE_CHOICES)
+    if discount_type and discount_type not in valid_types:
+        raise QuoteError(f"Unknown discount type {discount_type!r}.")
+    discount = _decimal(discount or 0, 'discount')
+    if discount_type == 'percentage' and discount > 100:
+        raise QuoteError("A percentage discount cannot exceed 100.")
+    try:
+        discount_total = _money(min(Decimal(discount_amount(subtotal, discount, discount_type)), subtotal))
+    except InvalidOperation:
+        raise QuoteError("discount is out of range.")
+
+    return {
+        'service_id': int(service_id),
+        'service': service_name,
+        'lines': lines,
+        'subtotal': str(subtotal),
+        'discount': str(discount_total),
+        'total': str(subtotal - discount_total),
+        'catalogue_version': table.version,
+    }
+
+
+def quote_batch(requests):
+    """
+    Quote many requests against one price table. Each result is either a quote or
+    {'error': message}, so an unknown option or a bad amount does not fail the batch;
+    a request that is not shaped like a quote raises MalformedQuote for the whole batch.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise QuoteError(f"A batch can have at most {MAX_BATCH_SIZE} quotes.")
+    table = get_price_table()
+    results = []
+    for index, request in enumerate(requests):
+        if not isinstance(request, dict):
+            raise MalformedQuote(f"Quote {index}: each quote must be an object.")
+        try:
+            results.append(quote(
+                table,
+                request.get('service_id'),
+                request.get('items') or [],
+                discount=request.get('discount'),
+                discount_type=request.get('discount_type'),
+            ))
+        except MalformedQuote as error:
+            raise MalformedQuote(f"Quote {index}: {error}")
+        except QuoteError as error:
+            results.append({'error': str(error)})
+    return results
@@ -0,0 +1,225 @@
+import re
+from django.db import connection as default_connection
+from django.db.models import Q
+from .models import Customer, Order, Service
+
+SEARCH_TABLE = 'system_order_search'
+MAX_ORDER_ID = 2**31 - 1  # AutoField upper bound
+
+
+def search_terms(query):
+    """Split free text into lowercase word tokens; punctuation is dropped."""
+    return re.findall(r'\w+', query.lower())
+
+
+class OrderSearchBackend:
+    """
+    Search index over orders, kept in a side table next to `system_order`.
+
+    Each document covers the order number, customer name and contact number, service
+    name, status and the text values of `job_specifications`. The index is refreshed
+    from the signal receivers in `system.signals`; `rebuild()` repopulates it from
+    scratch (see the `rebuild_order_search` management command). Queryset `.update()`
+    and `bulk_update()` calls send no signals, so code that changes indexed columns
+    that way must call `refresh()` for the rows it touched.
+
+    Subclasses implement `match(terms, limit)`, returning the matching order ids best
+    match first, and the table methods when they keep an index.
+    """
+    def __init__(self, connection=None):
+        self.connection = connection or default_connection
+
+    def create_table(self):
+        pass
+
+    def drop_table(self):
+        pass
+
+    def refresh(self, order_ids):
+        """Re-index the given orders."""
+
+    def remove(self, order_ids):
+        """Drop the given orders from the index."""
+
+    def rebuild(self):
+        self.remove_all()
+        self.refresh(None)
+
+    def remove_all(self):
+        pass
+
+    def search(self, query, limit=10):
+        """Return the ids of matching orders, best match first."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        order_ids = self.match(terms, limit)
+
+        # An exact order number outranks prefix hits on longer numbers.
+        # isdecimal(), not isdigit(): superscripts such as '²' are digits int() rejects.
+        if len(terms) == 1 and terms[0].isdecimal() and int(terms[0]) <= MAX_ORDER_ID:
+            exact = int(terms[0])
+            if exact in order_ids or Order.objects.filter(order_id=exact).exists():
+                order_ids = [exact] + [order_id for order_id in order_ids if order_id != exact]
+        return order_ids[:limit]
+
+    def match(self, terms, limit):
+        """Ids of the orders matching every term as a prefix, best match first."""
+        raise NotImplementedError
+
+    def _execute(self, sql, params=()):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+        return []
+
+    def _source_sql(self, columns, order_ids):
+        """SELECT of the indexed columns, joined from the live tables."""
+        where, params = '', []
+        if order_ids is not None:
+            where = f"WHERE o.order_id IN ({', '.join(['%s'] * len(order_ids))})"
+            params = list(order_ids)
+        sql = (
+            f"SELECT {columns} "
+            f"FROM {Order._meta.db_table} o "
+            f"JOIN {Customer._meta.db_table} c ON c.customer_id = o.customer_id "
+            f"JOIN {Service._meta.db_table} s ON s.service_id = o.service_id "
+            f"{where}"
+        )
+        return sql, params
+
+
+class SQLiteOrderSearchBackend(OrderSearchBackend):
+    """FTS5 virtual table whose rowid is the order id, ranked with bm25()."""
+
+    def create_table(self):
+        self._execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "order_number, customer_name, contact_number, service_name, status, specifications, "
+            "tokenize = 'unicode61')"
+        )
+
+    def drop_table(self):
+        self._execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def refresh(self, order_ids):
+        order_ids = None if order_ids is None else list(order_ids)
+        if order_ids == []:
+            return
+        if order_ids is not None:
+            self.remove(order_ids)
+
+        select, params = self._source_sql(
+            "o.order_id, CAST(o.order_id AS TEXT), c.name, c.contact_number, s.name, o.status, "
+            "(SELECT group_concat(j.value, ' ') FROM json_tree(o.job_specifications) j "
+            " WHERE j.type IN ('text', 'integer', 'real'))",
+            order_ids,
+        )
+        self._execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, order_number, customer_name, contact_number, "
+            f"service_name, status, specifications) {select}",
+            params,
+        )
+
+    def remove(self, order_ids):
+        order_ids = list(order_ids)
+        if order_ids:
+            self._execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(order_ids))})",
+                order_ids,
+            )
+
+    def remove_all(self):
+        self._execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def match(self, terms, limit):
+        # Every term must match, each as a prefix so results follow the typing.
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rows = self._execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in rows]
+
+
+class PostgreSQLOrderSearchBackend(OrderSearchBackend):
+    """tsvector table with a GIN index, ranked with ts_rank()."""
+
+    def create_table(self):
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "order_id integer PRIMARY KEY, document tsvector NOT NULL)"
+        )
+        self._execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        )
+
+    def drop_table(self):
+        self._execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def refresh(self, order_ids):
+        order_ids = None if order_ids is None else list(order_ids)
+        if order_ids == []:
+            return
+
+        # to_tsvector(jsonb) indexes only the string values of the specifications.
+        select, params = self._source_sql(
+            "o.order_id, "
+            "setweight(to_tsvector('simple', o.order_id::text), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(c.name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(c.contact_number, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') || "
+            "setweight(to_tsvector('simple', o.status), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(o.job_specifications, '{}'::jsonb)), 'D')",
+            order_ids,
+        )
+        self._execute(
+            f"INSERT INTO {SEARCH_TABLE} (order_id, document) {select} "
+            "ON CONFLICT (order_id) DO UPDATE SET document = EXCLUDED.document",
+            params,
+        )
+
+    def remove(self, order_ids):
+        order_ids = list(order_ids)
+        if order_ids:
+            self._execute(f"DELETE FROM {SEARCH_TABLE} WHERE order_id = ANY(%s)", [order_ids])
+
+    def remove_all(self):
+        self._execute(f"TRUNCATE {SEARCH_TABLE}")
+
+    def match(self, terms, limit):
+        rows = self._execute(
+            f"SELECT order_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+            "WHERE document @@ query ORDER BY ts_rank(document, query) DESC, order_id DESC LIMIT %s",
+            [' & '.join(f'{term}:*' for term in terms), limit],
+        )
+        return [row[0] for row in rows]
+
+
+class FallbackOrderSearchBackend(OrderSearchBackend):
+    """No index: a LIKE scan, for databases without a full-text backend."""
+
+    def match(self, terms, limit):
+        # Every term must appear in the service name, customer name or status.
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(service__name__icontains=term) |
+                Q(customer__name__icontains=term) |
+                Q(status__icontains=term)
+            )
+        return list(Order.objects.filter(condition).values_list('order_id', flat=True)[:limit])
+
+
+BACKENDS = {
+    'sqlite': SQLiteOrderSearchBackend,
+    'postgresql': PostgreSQLOrderSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, FallbackOrderSearchBackend)(connection)
@@ -0,0 +1,116 @@
+import uuid
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from .models import SetupDraft
+
+# The setup wizard stages its data in `SetupDraft` rows instead of the session. The
+# session only carries the draft key, so a step reads and writes the entries it
+# touches rather than re-serializing the whole wizard state on every request.
+SESSION_KEY = 'setup_draft'
+
+# Single-row sections, stored at position 0.
+SINGLE_SECTIONS = ('business_details', 'system_settings')
+
+# Attempts at claiming the next position when concurrent requests race for it.
+APPEND_ATTEMPTS = 5
+
+
+class SetupDraftStore:
+    def __init__(self, draft_key):
+        self.draft_key = draft_key
+
+    @classmethod
+    def for_request(cls, request):
+        """The draft of the current session, starting a new one if there is none."""
+        draft_key = request.session.get(SESSION_KEY)
+        if not draft_key:
+            draft_key = request.session[SESSION_KEY] = uuid.uuid4().hex
+        return cls(draft_key)
+
+    def _entries(self, section):
+        return SetupDraft.objects.filter(draft_key=self.draft_key, section=section)
+
+    def get(self, section, default=None):
+        """Data of a single-row section, or `default` if the step has not been saved."""
+        data = self._entries(section).filter(position=0).values_list('data', flat=True).first()
+        return default if data is None else data
+
+    def set(self, section, data):
+        SetupDraft.objects.update_or_create(
+            draft_key=self.draft_key, section=section, position=0, defaults={'data': data}
+        )
+
+    def items(self, section):
+        """Data of every entry of a list section, in the order they were added."""
+        return list(self._entries(section).order_by('position').values_list('data', flat=True))
+
+    def item(self, section, position):
+        return self._entries(section).filter(position=position).values_list('data', flat=True).first()
+
+    def last(self, section):
+        return self._entries(section).order_by('-position').values_list('data', flat=True).first()
+
+    def has_items(self, section):
+        return self._entries(section).exists()
+
+    def _next_position(self, section):
+        last = self._entries(section).aggregate(last=Max('position'))['last']
+        return 0 if last is None else last + 1
+
+    def append(self, section, data):
+        """
+        Add an entry at the end of a list section and return its position. Two requests
+        of the same session can read the same last position; the loser of the unique
+        (draft_key, section, position) constraint reads it again and retries.
+        """
+        for attempt in range(APPEND_ATTEMPTS):
+            position = self._next_position(section)
+            try:
+                with transaction.atomic():
+                    SetupDraft.objects.create(draft_key=self.draft_key, section=section, position=position, data=data)
+                return position
+            except IntegrityError:
+                if attempt == APPEND_ATTEMPTS - 1:
+                    raise
+
+    @transaction.atomic
+    def update_item(self, section, position, update):
+        """
+        Apply `update(data)` to one entry and save it; `update` changes the data in
+        place. Returns the updated data, or None if there is no such entry.
+        """
+        entry = self._entries(section).select_for_update().filter(position=position).first()
+        if entry is None:
+            return None
+        update(entry.data)
+        entry.save(update_fields=['data', 'updated_at'])
+        return entry.data
+
+    def as_setup_data(self):
+        """
+        Every section in one query, keyed like the old session data and ready for
+        `system.setup_import.import_setup_data`.
+        """
+        data = {
+            'business_details': {},
+            'services_data': [],
+            'equipment': [],
+            'inventory': {},
+            'supplier': [],
+            'customer': [],
+            'system_settings': {},
+        }
+        lists = {'service': 'services_data', 'equipment': 'equipment', 'supplier': 'supplier', 'customer': 'customer'}
+        entries = SetupDraft.objects.filter(draft_key=self.draft_key).order_by('section', 'position')
+        for section, entry in entries.values_list('section', 'data'):
+            if section in SINGLE_SECTIONS:
+                data[section] = entry
+            elif section == 'material':
+                material = dict(entry)
+                data['inventory'].setdefault(material.pop('category'), []).append(material)
+            else:
+                data[lists[section]].append(entry)
+        return data
+
+    def clear(self):
+        SetupDraft.objects.filter(draft_key=self.draft_key).delete()
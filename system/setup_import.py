@@ -0,0 +1,241 @@
+import time
+from contextlib import contextmanager
+from django.db import transaction
+from .catalogue import bump_catalogue_version
+from .equipment_materials import bump_equipment_materials_version
+from .fragments import bump_generation
+from .models import BusinessDetails, SystemSettings, Service, CustomizationOption, PricingOption
+from .models import Equipment, InventoryCategory, Inventory, Supplier, Customer
+
+# Saves the staged setup data (business details, services, equipment, inventory,
+# suppliers, customers, system settings) in a fixed number of statements per stage:
+# names that are looked up or reused (customization options, categories, suppliers)
+# are resolved up front into dictionaries and every table is filled with
+# `bulk_create`. `bulk_create` bypasses the save signals, so the catalogue version, the
+# equipment materials version and the fragment generations are bumped here once the
+# rows are in.
+BATCH_SIZE = 500
+
+SUPPLIER_FIELDS = ['contact_person', 'phone_number', 'email', 'address', 'additional_info']
+
+
+class ImportReport:
+    """Row counts and wall time per stage, returned in the save_to_database response."""
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        counts = {}
+        start = time.perf_counter()
+        yield counts
+        self.stages[name] = {**counts, 'seconds': round(time.perf_counter() - start, 4)}
+
+    def as_dict(self):
+        return {
+            'stages': self.stages,
+            'seconds': round(sum(stage['seconds'] for stage in self.stages.values()), 4),
+        }
+
+
+def resolve_names(model, field, names):
+    """({name: instance} for `names`, number created), creating the ones that do not exist yet."""
+    names = set(names)
+    existing = {getattr(obj, field): obj for obj in model.objects.filter(**{f'{field}__in': names})}
+    missing = [model(**{field: name}) for name in sorted(names - existing.keys())]
+    if missing:
+        model.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        # Not every backend returns primary keys from bulk_create; read the new rows back.
+        if missing[0].pk is None:
+            missing = model.objects.filter(**{f'{field}__in': [getattr(obj, field) for obj in missing]})
+        existing.update({getattr(obj, field): obj for obj in missing})
+    return existing, len(missing)
+
+
+def save_business_details(business_details, report):
+    with report.stage('business_details') as counts:
+        counts['rows'] = 0
+        if business_details:
+            BusinessDetails.objects.create(
+                name=business_details['business_name'],
+                address=business_details['business_address'],
+                contact_number=business_details['contact_number'],
+                email=business_details['email'],
+                tax_identification_number=business_details['tin'],
+                logo=business_details.get('logo'),
+            )
+            counts['rows'] = 1
+
+
+def save_services(services_data, report):
+    """Services with their customization options (matched by lowercased name) and pricing options."""
+    with report.stage('services') as counts:
+        customizations, counts['customization_options_created'] = resolve_names(
+            CustomizationOption, 'name',
+            (option['name'].lower() for service in services_data for option in service['customization_options']),
+        )
+
+        services = Service.objects.bulk_create(
+            [Service(name=service_data['name']) for service_data in services_data], batch_size=BATCH_SIZE
+        )
+
+        links, pricing_options = [], []
+        Through = Service.customization_options.through
+        for service, service_data in zip(services, services_data):
+            linked = set()
+            for option in service_data['customization_options']:
+                customization = customizations[option['name'].lower()]
+                if customization.pk not in linked:
+                    linked.add(customization.pk)
+                    links.append(Through(service_id=service.pk, customizationoption_id=customization.pk))
+                for pricing in option.get('pricing_options', []):
+                    pricing_options.append(PricingOption(
+                        service=service,
+                        customization_option=customization,
+                        description=pricing['description'],
+                        price=pricing['price'],
+                    ))
+
+        Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+        PricingOption.objects.bulk_create(pricing_options, batch_size=BATCH_SIZE)
+        counts.update(services=len(services), pricing_options=len(pricing_options))
+
+
+def save_equipment(equipment_data, report):
+    with report.stage('equipment') as counts:
+        Equipment.objects.bulk_create(
+            [
+                Equipment(
+                    name=equipment['name'],
+                    description=equipment.get('description'),
+                    condition=equipment['condition'],
+                )
+                for equipment in equipment_data
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        counts['rows'] = len(equipment_data)
+
+
+def save_suppliers(suppliers_data, inventory_data, report):
+    """
+    Suppliers named in the supplier list or by an inventory material, matched by name.
+    Known suppliers only get their blank fields filled in; returns {name: supplier}.
+    """
+    with report.stage('suppliers') as counts:
+        details = {}
+        for supplier_data in suppliers_data:
+            merged = details.setdefault(supplier_data['supplier_name'], {})
+            for field in SUPPLIER_FIELDS:
+                if supplier_data.get(field) and not merged.get(field):
+                    merged[field] = supplier_data[field]
+
+        names = set(details)
+        names.update(
+            material['supplier'] for materials in inventory_data.values()
+            for material in materials if material.get('supplier')
+        )
+
+        suppliers = {}
+        for supplier in Supplier.objects.filter(supplier_name__in=names).order_by('pk'):
+            suppliers.setdefault(supplier.supplier_name, supplier)
+
+        changed = []
+        for name, supplier in suppliers.items():
+            filled = False
+            for field, value in details.get(name, {}).items():
+                if not getattr(supplier, field):
+                    setattr(supplier, field, value)
+                    filled = True
+            if filled:
+                changed.append(supplier)
+        Supplier.objects.bulk_update(changed, SUPPLIER_FIELDS, batch_size=BATCH_SIZE)
+
+        missing = [
+            Supplier(supplier_name=name, **details.get(name, {}))
+            for name in sorted(names - suppliers.keys())
+        ]
+        Supplier.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        if missing and missing[0].pk is None:
+            missing = Supplier.objects.filter(supplier_name__in=[supplier.supplier_name for supplier in missing])
+        suppliers.update({supplier.supplier_name: supplier for supplier in missing})
+        counts.update(created=len(missing), updated=len(changed))
+        return suppliers
+
+
+def save_inventory(inventory_data, suppliers, report):
+    with report.stage('inventory') as counts:
+        categories, counts['categories_created'] = resolve_names(
+            InventoryCategory, 'category_name', inventory_data.keys()
+        )
+        materials = [
+            Inventory(
+                name=material['name'],
+                category=categories[category_name],
+                stock_level=material['stock_level'],
+                reorder_threshold=material['reorder_threshold'],
+                supplier=suppliers.get(material['supplier']) if material.get('supplier') else None,
+                unit_of_measurement=material['unit'],
+            )
+            for category_name, category_materials in inventory_data.items()
+            for material in category_materials
+        ]
+        Inventory.objects.bulk_create(materials, batch_size=BATCH_SIZE)
+        counts['rows'] = len(materials)
+
+
+def save_customers(customers_data, report):
+    with report.stage('customers') as counts:
+        customers = []
+        for customer_data in customers_data:
+            customer = Customer(
+                name=customer_data['name'],
+                contact_number=customer_data['contact_number'],
+                email=customer_data['email'],
+                address=customer_data.get('address', ""),
+            )
+            # Customer.save() fills the lookup keys; bulk_create does not call it.
+            customer.refresh_lookup_keys()
+            customers.append(customer)
+        Customer.objects.bulk_create(customers, batch_size=BATCH_SIZE)
+        counts['rows'] = len(customers)
+
+
+def save_system_settings(system_settings, report):
+    with report.stage('system_settings') as counts:
+        counts['rows'] = 0
+        if system_settings:
+            SystemSettings.objects.update_or_create(
+                smtp_email=system_settings['smtp_email'],
+                defaults={
+                    'smtp_server': system_settings['smtp_server'],
+                    'smtp_port': system_settings['smtp_port'],
+                    'smtp_password': system_settings['smtp_password'],
+                },
+            )
+            counts['rows'] = 1
+
+
+@transaction.atomic
+def import_setup_data(data):
+    """
+    Save staged setup data, keyed as in `SetupDraftStore.as_setup_data()`
+    ('business_details', 'services_data', 'equipment', 'inventory', 'supplier',
+    'customer', 'system_settings'), in one transaction. Returns the ImportReport as a dict.
+    """
+    report = ImportReport()
+    inventory_data = data.get('inventory') or {}
+
+    save_business_details(data.get('business_details') or {}, report)
+    save_services(data.get('services_data') or [], report)
+    save_equipment(data.get('equipment') or [], report)
+    suppliers = save_suppliers(data.get('supplier') or [], inventory_data, report)
+    save_inventory(inventory_data, suppliers, report)
+    save_customers(data.get('customer') or [], report)
+    save_system_settings(data.get('system_settings') or {}, report)
+
+    bump_catalogue_version()
+    bump_equipment_materials_version()
+    for model in (Customer, Equipment, Inventory, InventoryCategory, Supplier):
+        bump_generation(model)
+    return report.as_dict()
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from .models import BusinessDetails, SystemSettings
+
+
+class SetupState:
+    """
+    Process-wide cache of the provisioning checks the middlewares run on every request.
+
+    Only positive answers are cached: once the system is provisioned the checks cost
+    zero queries, while an unprovisioned system keeps asking the database so a
+    superuser created by another worker process is picked up on the next request.
+    The cache is cleared by the signal receivers in `system.signals`.
+    """
+    _superuser_exists = False
+    _setup_complete = False
+
+    @classmethod
+    def superuser_exists(cls):
+        if not cls._superuser_exists:
+            cls._superuser_exists = User.objects.filter(
+                is_staff=True, is_active=True, is_superuser=True
+            ).exists()
+        return cls._superuser_exists
+
+    @classmethod
+    def setup_complete(cls):
+        """True once the setup wizard has saved BusinessDetails and SystemSettings."""
+        if not cls._setup_complete:
+            cls._setup_complete = (
+                BusinessDetails.objects.exists() and
+                SystemSettings.objects.exists()
+            )
+        return cls._setup_complete
+
+    @classmethod
+    def invalidate_superuser(cls):
+        cls._superuser_exists = False
+
+    @classmethod
+    def invalidate_setup(cls):
+        cls._setup_complete = False
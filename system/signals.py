@@ -0,0 +1,145 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import customer_stats, metrics
+from .catalogue import bump_catalogue_version
+from .equipment_materials import bump_equipment_materials_version
+from .fragments import bump_generation
+from .models import BusinessDetails, SystemSettings, Order, Customer, Service, Payment, Production
+from .models import Inventory, InventoryCategory, Supplier, CustomizationOption, PricingOption, Equipment
+from .search import get_search_backend
+from .setup_state import SetupState
+from .typeahead import typeahead_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_superuser_state(sender, **kwargs):
+    SetupState.invalidate_superuser()
+
+
+@receiver(post_save, sender=BusinessDetails)
+@receiver(post_delete, sender=BusinessDetails)
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+def invalidate_setup_state(sender, **kwargs):
+    SetupState.invalidate_setup()
+
+
+@receiver(post_save, sender=Order)
+def index_order(sender, instance, **kwargs):
+    get_search_backend().refresh([instance.pk])
+    typeahead_cache.clear()
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+    typeahead_cache.clear()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Service)
+def reindex_related_orders(sender, instance, created, **kwargs):
+    # A new customer or service has no orders yet.
+    if not created:
+        get_search_backend().refresh(instance.orders.values_list('order_id', flat=True))
+        typeahead_cache.clear()
+
+
+@receiver(post_save, sender=Production)
+@receiver(post_delete, sender=Production)
+def clear_production_suggestions(sender, **kwargs):
+    typeahead_cache.clear()
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=Production)
+def stash_stored_row(sender, instance, raw=False, **kwargs):
+    # The rollup receivers below diff the saved row against the stored one.
+    if not raw:
+        instance._stored_row = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups(sender, instance, raw=False, **kwargs):
+    if not raw:
+        metrics.payment_post_save(instance, instance._stored_row)
+        customer_stats.payment_post_save(instance, instance._stored_row)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_rollups(sender, instance, **kwargs):
+    metrics.payment_post_delete(instance)
+    customer_stats.payment_post_delete(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollups(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        before = None if created else instance._stored_row
+        metrics.order_post_save(instance, before)
+        customer_stats.order_post_save(instance, before)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_rollups(sender, instance, **kwargs):
+    metrics.order_post_delete(instance)
+    customer_stats.order_post_delete(instance)
+
+
+@receiver(post_save, sender=Production)
+def update_production_rollups(sender, instance, raw=False, **kwargs):
+    if not raw:
+        metrics.production_post_save(instance, instance._stored_row)
+
+
+@receiver(post_delete, sender=Production)
+def remove_production_rollups(sender, instance, **kwargs):
+    metrics.production_post_delete(instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=InventoryCategory)
+@receiver(post_delete, sender=InventoryCategory)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_fragment_generation(sender, **kwargs):
+    bump_generation(sender)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=CustomizationOption)
+@receiver(post_delete, sender=CustomizationOption)
+@receiver(post_save, sender=PricingOption)
+@receiver(post_delete, sender=PricingOption)
+@receiver(m2m_changed, sender=Service.customization_options.through)
+def invalidate_catalogue(sender, action=None, **kwargs):
+    # m2m_changed fires before and after; the post_* actions are the ones that change rows.
+    if action is None or action.startswith('post_'):
+        bump_catalogue_version()
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=InventoryCategory)
+@receiver(post_delete, sender=InventoryCategory)
+@receiver(post_delete, sender=Equipment)
+@receiver(m2m_changed, sender=InventoryCategory.associated_equipment.through)
+def invalidate_equipment_materials(sender, action=None, **kwargs):
+    if action is None or action.startswith('post_'):
+        bump_equipment_materials_version()
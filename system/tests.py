@@ -1,3 +1,1141 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from importlib import import_module
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.db import connection
+from django.db.models import F, Q
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from .kpis import dashboard_kpis
+from . import metrics
+from .fragments import generations
+from .catalogue import get_catalogue
+from .equipment_materials import get_equipment_materials, materials_for_equipment
+from .management.commands import import_master_data
+from .master_data import CustomerImporter, InventoryImporter
+from .models import Customer, CustomizationOption, Equipment, Inventory, InventoryCategory, Service, Order, Payment, PricingOption, Production, QualityCheck, Sequence, Supplier
+from .pagination import paginate_archive
+from .order_queue import QUEUE_GAP, QueueConflict, next_queue_rank, reorder_queue
+from .search import SEARCH_TABLE, FallbackOrderSearchBackend, get_search_backend
+from .setup_draft import SetupDraftStore
+from .setup_import import import_setup_data
+from .typeahead import TypeaheadCache, job_id_prefix_filter, typeahead_cache
 
-# Create your tests here.
+
+def make_order(customer, service, status='PENDING'):
+    order = Order.objects.create(
+        customer=customer,
+        service=service,
+        status=status,
+        deadline=timezone.now() + timedelta(days=7),
+    )
+    if status in Order.ACTIVE_STATUSES:
+        order.order_queue = next_queue_rank()
+        order.save(update_fields=['order_queue'])
+    return order
+
+
+class OrderQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.service = Service.objects.create(name="Tarpaulin Printing")
+
+    def setUp(self):
+        self.orders = [make_order(self.customer, self.service) for _ in range(3)]
+
+    def ranks(self):
+        return [order.order_queue for order in self.orders]
+
+    def test_reorder_reuses_the_listed_ranks(self):
+        first, second, third = self.orders
+        reorder_queue([third.pk, first.pk, second.pk], [third.order_queue, first.order_queue, second.order_queue])
+
+        self.assertEqual(
+            list(Order.objects.queue().values_list('order_id', flat=True)), [third.pk, first.pk, second.pk]
+        )
+
+    def test_stale_page_raises_queue_conflict(self):
+        first, second, third = self.orders
+        seen = self.ranks()
+        # Someone else moves the first order to the back after the page was loaded.
+        reorder_queue([second.pk, third.pk, first.pk], [second.order_queue, third.order_queue, first.order_queue])
+        after = list(Order.objects.queue().values_list('order_id', 'order_queue'))
+
+        with self.assertRaises(QueueConflict):
+            reorder_queue([third.pk, second.pk, first.pk], [seen[2], seen[1], seen[0]])
+        self.assertEqual(list(Order.objects.queue().values_list('order_id', 'order_queue')), after)
+
+    def test_stale_page_returns_409(self):
+        first, second, third = self.orders
+        seen = self.ranks()
+        first.status = 'CANCELLED'
+        first.order_queue = None
+        first.save()
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('update_order_queue'), {
+            'order[]': [second.pk, first.pk, third.pk],
+            'rank[]': [seen[1], seen[0], seen[2]],
+        })
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
+        self.assertIn('orders_queue', response.json())
+
+
+class QueueRankAllocationTests(TransactionTestCase):
+    """next_queue_rank() hands out distinct, gap-free ranks when called concurrently."""
+    THREADS = 8
+    PER_THREAD = 10
+
+    def allocate_in_parallel(self, allocate):
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                ranks = [allocate() for _ in range(self.PER_THREAD)]
+                results.extend(ranks)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_parallel_sequence_values_are_distinct_and_gap_free(self):
+        values = self.allocate_in_parallel(lambda: Sequence.next_value('test_counter'))
+        self.assertEqual(sorted(values), list(range(1, self.THREADS * self.PER_THREAD + 1)))
+
+    def test_parallel_queue_ranks_are_distinct_and_gap_free(self):
+        ranks = self.allocate_in_parallel(next_queue_rank)
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(sorted(ranks), [index * QUEUE_GAP for index in range(1, total + 1)])
+
+
+class OrderListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.service = Service.objects.create(name="Sticker Printing")
+        for index in range(12):
+            customer = Customer.objects.create(name=f"Customer {index}", contact_number=f"0917000{index:04}")
+            make_order(customer, cls.service, ['PENDING', 'IN PROGRESS', 'COMPLETED', 'CANCELLED'][index % 4])
+        Order.objects.filter(completed_or_cancelled__isnull=True, status__in=Order.ARCHIVED_STATUSES).update(
+            completed_or_cancelled=timezone.now()
+        )
+
+    def test_queue_page_renders_in_fixed_queries(self):
+        # COUNT for the paginator, then the page with names and positions joined in.
+        with self.assertNumQueries(2):
+            page = Paginator(Order.objects.queue(), 10).get_page(1)
+            render_to_string('includes/orders_queue.html', {'pending_progress': page})
+        self.assertEqual([order.queue_position for order in page], [1, 2, 3, 4, 5, 6])
+
+    def test_archive_page_renders_in_one_query(self):
+        with self.assertNumQueries(1):
+            page = paginate_archive(Order.objects.archive(), None, 10)
+            render_to_string('includes/orders_completed.html', {'completed_cancelled': page})
+        self.assertEqual(len(page), 6)
+
+    def add_orders(self, count):
+        for index in range(count):
+            customer = Customer.objects.create(name=f"Extra {index}", contact_number=f"0918000{index:04}")
+            make_order(customer, self.service, ['PENDING', 'COMPLETED'][index % 2])
+        Order.objects.filter(completed_or_cancelled__isnull=True, status__in=Order.ARCHIVED_STATUSES).update(
+            completed_or_cancelled=timezone.now()
+        )
+
+    def assertConstantQueries(self, num, request):
+        """`request()` runs in `num` queries, and still does with twenty more orders."""
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            request()  # warm the per-process caches (catalogue, generations)
+        for extra in (0, 20):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_orders(extra)
+            typeahead_cache.clear()
+            # The generation bumps run on commit; count them as part of the request.
+            with self.assertNumQueries(num), self.captureOnCommitCallbacks(execute=True):
+                response = request()
+            self.assertEqual(response.status_code, 200)
+
+    def test_orders_page_queries(self):
+        self.assertConstantQueries(6, lambda: self.client.get(reverse('orders')))
+
+    def test_paginated_queue_queries(self):
+        self.assertConstantQueries(4, lambda: self.client.get(
+            reverse('get_paginated_orders'), {'page_pp': 2}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        ))
+
+    def test_paginated_archive_queries(self):
+        self.assertConstantQueries(3, lambda: self.client.get(
+            reverse('get_paginated_orders'), {'cursor_cc': ''}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        ))
+
+    def test_refresh_order_queue_queries(self):
+        self.assertConstantQueries(4, lambda: self.client.get(reverse('refresh_order_queue')))
+
+    def test_cancel_order_queries(self):
+        queued = iter(list(Order.objects.queue().values_list('order_id', flat=True)))
+        self.assertConstantQueries(17, lambda: self.client.post(
+            reverse('cancel_order', args=[next(queued)]), {'page_pp': 1},
+        ))
+
+    def test_update_order_queue_queries(self):
+        def reorder():
+            # The page being reordered is read here too, so one of the queries is the test's.
+            orders = list(Order.objects.queue()[:10])
+            return self.client.post(reverse('update_order_queue'), {
+                'order[]': [order.pk for order in reversed(orders)],
+                'rank[]': [order.order_queue for order in reversed(orders)],
+            })
+        self.assertConstantQueries(9, reorder)
+
+    def test_search_orders_queries(self):
+        self.assertConstantQueries(4, lambda: self.client.get(
+            reverse('search_orders'), {'query': 'Sticker'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        ))
+
+    def test_submitted_production_keeps_the_order_queued(self):
+        order = Order.objects.queue().first()
+        self.client.force_login(self.admin)
+        self.client.post(reverse('submit_production'), {'order': order.pk, 'priority': 'HIGH'})
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'IN PROGRESS')
+        self.assertTrue(Production.objects.filter(order=order).exists())
+        self.assertIn(order.pk, Order.objects.queue().values_list('order_id', flat=True))
+
+
+@skipUnless(connection.vendor == 'sqlite', "The query plans checked are SQLite's.")
+class OrderIndexTests(TestCase):
+    """The hot list and dashboard queries are served by the indexes added in migration 0029."""
+
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(name="Sticker Printing")
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        for index, status in enumerate(['PENDING', 'IN PROGRESS', 'COMPLETED', 'CANCELLED'] * 5):
+            order = make_order(customer, service, status)
+            Payment.objects.create(order=order, amount=Decimal('500.00'), status=['PAID', 'PENDING'][index % 2])
+            Production.objects.create(
+                order=order, equipment_assigned=[],
+                status=['IN_PROGRESS', 'ON_HOLD', 'COMPLETED'][index % 3],
+                priority=['HIGH', 'MODERATE', 'LOW'][index % 3],
+            )
+            Inventory.objects.create(name=f"Material {index}", stock_level=index, reorder_threshold=10)
+
+    def test_queue_uses_status_queue_index(self):
+        plan = Order.objects.queue().explain()
+        self.assertIn('order_status_queue_idx', plan)
+        self.assertNotIn('SCAN system_order', plan)
+
+    def test_archive_uses_status_archive_index(self):
+        plan = Order.objects.archive()[:10].explain()
+        self.assertIn('order_status_archive_idx', plan)
+        self.assertNotIn('SCAN system_order', plan)
+
+    def test_recent_orders_use_created_index(self):
+        plan = Order.objects.order_by('-created_at')[:5].explain()
+        self.assertIn('order_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_paid_revenue_uses_payment_status_date_index(self):
+        plan = Payment.objects.filter(status='PAID').values('payment_date').explain()
+        self.assertIn('payment_status_date_idx', plan)
+        self.assertNotIn('SCAN system_payment', plan)
+
+    def test_pending_tasks_use_production_status_priority_index(self):
+        plan = Production.objects.filter(Q(status='IN_PROGRESS') | Q(status='ON_HOLD'), priority='HIGH').explain()
+        self.assertIn('production_status_priority_idx', plan)
+        self.assertNotIn('SCAN system_production', plan)
+
+    def test_low_stock_uses_partial_index(self):
+        plan = Inventory.objects.filter(stock_level__lt=F('reorder_threshold')).explain()
+        self.assertIn('inventory_low_stock_idx', plan)
+
+
+class OrderSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(name="Sticker Printing")
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.orders = [make_order(customer, service) for _ in range(12)]
+
+    def test_exact_order_number_ranks_first(self):
+        order = self.orders[0]
+        self.assertEqual(get_search_backend().search(str(order.pk))[0], order.pk)
+
+    def test_non_ascii_digits_do_not_error(self):
+        self.assertEqual(get_search_backend().search('²'), [])
+        self.assertEqual(get_search_backend().search('9' * 30), [])
+
+    def test_fallback_matches_every_term(self):
+        backend = FallbackOrderSearchBackend()
+        self.assertEqual(len(backend.search('sticker juan', limit=20)), 12)
+        self.assertEqual(backend.search('sticker maria'), [])
+        self.assertEqual(backend.search(str(self.orders[3].pk))[0], self.orders[3].pk)
+
+    @skipUnless(connection.vendor == 'sqlite', "reads the FTS5 table directly")
+    def test_status_fix_migration_reindexes_orders(self):
+        order = self.orders[0]
+        Order.objects.filter(pk=order.pk).update(status='IN_PROGRESS')
+        get_search_backend().refresh([order.pk])
+
+        migration = import_module('system.migrations.0037_order_in_progress_status')
+        schema_editor = mock.Mock(connection=connection)
+        schema_editor.execute.side_effect = lambda sql, params=(): connection.cursor().execute(sql, params)
+        migration.fix_in_progress_orders(django_apps, schema_editor)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT status FROM {SEARCH_TABLE} WHERE rowid = %s", [order.pk])
+            self.assertEqual(cursor.fetchall(), [('IN PROGRESS',)])
+
+
+class TypeaheadCacheTests(TestCase):
+    def counting(self, value):
+        calls = []
+
+        def compute():
+            calls.append(value)
+            return value
+        return compute, calls
+
+    def test_least_recently_used_entry_is_evicted(self):
+        lookups = TypeaheadCache(maxsize=2)
+        compute_a, calls_a = self.counting('a')
+        compute_b, calls_b = self.counting('b')
+        lookups.get_or_compute('a', compute_a)
+        lookups.get_or_compute('b', compute_b)
+        lookups.get_or_compute('a', compute_a)  # 'b' is now the oldest
+        lookups.get_or_compute('c', lambda: 'c')
+
+        self.assertEqual(lookups.get_or_compute('a', compute_a), 'a')
+        self.assertEqual(lookups.get_or_compute('b', compute_b), 'b')
+        self.assertEqual((len(calls_a), len(calls_b)), (1, 2))
+
+    def test_entries_expire_after_ttl(self):
+        lookups = TypeaheadCache(ttl=10)
+        compute, calls = self.counting('a')
+        with mock.patch('system.typeahead.time.monotonic', return_value=100):
+            lookups.get_or_compute('a', compute)
+            lookups.get_or_compute('a', compute)
+        with mock.patch('system.typeahead.time.monotonic', return_value=111):
+            lookups.get_or_compute('a', compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_clear_invalidates_entries_and_inflight_results(self):
+        lookups = TypeaheadCache()
+        compute, calls = self.counting('a')
+        lookups.get_or_compute('a', compute)
+        lookups.clear()
+        lookups.get_or_compute('a', compute)
+        self.assertEqual(len(calls), 2)
+
+        def compute_then_clear():
+            lookups.clear()  # a write lands while the lookup is running
+            return 'stale'
+        self.assertEqual(lookups.get_or_compute('b', compute_then_clear), 'stale')
+        self.assertEqual(lookups.get_or_compute('b', lambda: 'fresh'), 'fresh')
+
+    def test_concurrent_misses_compute_once(self):
+        lookups = TypeaheadCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return 'result'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(lookups.get_or_compute('key', compute)))
+            for _ in range(8)
+        ]
+        threads[0].start()
+        self.assertTrue(started.wait(timeout=5))
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)  # let the followers queue up behind the leader
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 8)
+
+
+class JobIdPrefixFilterTests(TestCase):
+    def test_prefix_expands_to_ranges(self):
+        condition = job_id_prefix_filter('12', 1300)
+        self.assertEqual(len(condition.children), 3)  # 12, 120..129, 1200..1299
+
+    def test_zero_and_leading_zero_match_nothing(self):
+        for prefix in ['0', '00', '012']:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(job_id_prefix_filter(prefix, 10**6), Q(pk__in=[]))
+
+    def test_rejects_non_decimal_prefix(self):
+        for prefix in ['²', '1a', '']:
+            with self.subTest(prefix=prefix), self.assertRaises(ValueError):
+                job_id_prefix_filter(prefix, 100)
+
+
+class DashboardKpiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(name="Sticker Printing")
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        for status, payment_status, amount, production_status in [
+            ('COMPLETED', 'PAID', '500.00', 'COMPLETED'),
+            ('IN PROGRESS', 'PAID', '250.00', 'IN_PROGRESS'),
+            ('COMPLETED', 'PENDING', '300.00', 'COMPLETED'),
+            ('PENDING', 'PENDING', '100.00', None),
+        ]:
+            order = make_order(customer, service, status)
+            Payment.objects.create(order=order, amount=Decimal(amount), status=payment_status)
+            if production_status:
+                Production.objects.create(order=order, equipment_assigned=[], status=production_status)
+
+    def test_kpis_take_three_queries(self):
+        with self.assertNumQueries(3):
+            kpis = dashboard_kpis()
+
+        self.assertEqual(kpis['total_revenue'], Decimal('750.00'))
+        self.assertEqual(kpis['overdue_payments'], Decimal('300.00'))
+        self.assertEqual(kpis['order_status_counts'], [1, 1, 2, 0])
+        self.assertEqual(sum(total for _, total in kpis['revenue_months']), Decimal('750.00'))
+
+
+class DashboardMetricsTests(TestCase):
+    """The signal receivers keep the rollup tables equal to a full recomputation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(name="Sticker Printing")
+        cls.customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+
+    def assertNoDrift(self):
+        self.assertEqual(metrics.check(), {})
+
+    def test_order_created_and_status_changed(self):
+        order = make_order(self.customer, self.service)
+        self.assertNoDrift()
+        order.status = 'IN PROGRESS'
+        order.save()
+        self.assertNoDrift()
+        order.status = 'COMPLETED'
+        order.save()
+        self.assertNoDrift()
+        self.assertEqual(metrics.dashboard_totals()['order_status_counts'], [0, 0, 1, 0])
+
+    def test_payment_created_paid_and_deleted(self):
+        order = make_order(self.customer, self.service)
+        payment = Payment.objects.create(order=order, amount=Decimal('400.00'))
+        self.assertNoDrift()
+        payment.status = 'PAID'
+        payment.save()
+        self.assertNoDrift()
+        self.assertEqual(metrics.dashboard_totals()['total_revenue'], Decimal('400.00'))
+        payment.amount = Decimal('450.00')
+        payment.save()
+        self.assertNoDrift()
+        payment.delete()
+        self.assertNoDrift()
+        self.assertEqual(metrics.dashboard_totals()['total_revenue'], Decimal('0.00'))
+
+    def test_overdue_follows_production_and_payment(self):
+        order = make_order(self.customer, self.service)
+        payment = Payment.objects.create(order=order, amount=Decimal('300.00'))
+        job = Production.objects.create(order=order, equipment_assigned=[], status='IN_PROGRESS')
+        self.assertNoDrift()
+        job.status = 'COMPLETED'
+        job.save()
+        self.assertNoDrift()
+        self.assertEqual(metrics.dashboard_totals()['overdue_payments'], Decimal('300.00'))
+        payment.status = 'PAID'
+        payment.save()
+        self.assertNoDrift()
+        self.assertEqual(metrics.dashboard_totals()['overdue_payments'], Decimal('0.00'))
+
+    def test_order_deleted_with_its_payments(self):
+        order = make_order(self.customer, self.service)
+        Payment.objects.create(order=order, amount=Decimal('200.00'), status='PAID')
+        Payment.objects.create(order=order, amount=Decimal('100.00'))
+        Production.objects.create(order=order, equipment_assigned=[], status='COMPLETED')
+        self.assertNoDrift()
+        order.delete()
+        self.assertNoDrift()
+
+
+class DashboardChartsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        service = Service.objects.create(name="Sticker Printing")
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.order = make_order(customer, service)
+        cls.payment = Payment.objects.create(order=cls.order, amount=Decimal('500.00'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_charts(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('dashboard_charts'), **headers)
+
+    def assertChangesEtag(self, change):
+        etag = self.get_charts()['ETag']
+        self.assertEqual(self.get_charts(etag).status_code, 304)
+        change()
+        response = self.get_charts(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response.json()
+
+    def test_unchanged_rollups_return_not_modified(self):
+        response = self.get_charts()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_charts(response['ETag']).status_code, 304)
+
+    def test_order_update_changes_etag(self):
+        def start_order():
+            self.order.status = 'IN PROGRESS'
+            self.order.save()
+        charts = self.assertChangesEtag(start_order)
+        self.assertEqual(charts['order_status_data'], [0, 1, 0, 0])
+
+    def test_payment_update_changes_etag(self):
+        def pay():
+            self.payment.status = 'PAID'
+            self.payment.save()
+        charts = self.assertChangesEtag(pay)
+        self.assertEqual(charts['revenue_data'], [500.0])
+
+
+class DashboardFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        service = Service.objects.create(name="Sticker Printing")
+        cls.customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.order = make_order(cls.customer, service)
+        cls.payment = Payment.objects.create(order=cls.order, amount=Decimal('500.00'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def recent_orders_key(self):
+        current = generations(Order, Customer, Payment)
+        return make_template_fragment_key(
+            'dashboard_recent_orders', [current['order'], current['customer'], current['payment']]
+        )
+
+    def test_order_edit_changes_rendered_fragment(self):
+        self.assertContains(self.client.get(reverse('dashboard')), 'PENDING')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.status = 'CANCELLED'
+            self.order.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'CANCELLED')
+        self.assertNotContains(response, 'PENDING')
+
+    def test_customer_and_payment_saves_invalidate_recent_orders(self):
+        for instance in [self.customer, self.payment]:
+            with self.subTest(model=type(instance).__name__):
+                self.client.get(reverse('dashboard'))
+                key = self.recent_orders_key()
+                self.assertIsNotNone(cache.get(key))
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    instance.save()
+                self.assertNotEqual(self.recent_orders_key(), key)
+                self.assertIsNone(cache.get(self.recent_orders_key()))
+
+    def test_generation_is_bumped_on_commit(self):
+        before = generations(Order)['order']
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.order.save()
+            self.assertEqual(generations(Order)['order'], before)
+        callbacks[-1]()
+        self.assertEqual(generations(Order)['order'], before + 1)
+
+
+class CrmQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.service = Service.objects.create(name="Sticker Printing")
+        cls.customer = cls.add_customers(1)[0]
+
+    @classmethod
+    def add_customers(cls, count, orders=3, start=0):
+        customers = []
+        for index in range(start, start + count):
+            customer = Customer.objects.create(name=f"Customer {index}", contact_number=f"0917{index:07}")
+            for _ in range(orders):
+                order = make_order(customer, cls.service)
+                Payment.objects.create(order=order, amount=Decimal('100.00'))
+            customers.append(customer)
+        return customers
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertConstantQueries(self, num, request, grow):
+        request()  # warm the per-process setup state
+        for step in range(2):
+            if step:
+                grow()
+            cache.clear()  # render the customer cards instead of reading the fragment
+            with self.assertNumQueries(num):
+                response = request()
+            self.assertEqual(response.status_code, 200)
+
+    def test_crm_page_queries(self):
+        # Session, user, count, generations, customers with their payment counts,
+        # recent orders, their payments.
+        self.assertConstantQueries(
+            7, lambda: self.client.get(reverse('crm_view')),
+            lambda: self.add_customers(20, start=1),
+        )
+
+    def test_customer_history_queries(self):
+        # Session, user, customer, orders with services, payments.
+        self.assertConstantQueries(
+            5, lambda: self.client.get(reverse('crm_customer_history', args=[self.customer.pk])),
+            lambda: [
+                Payment.objects.create(order=make_order(self.customer, self.service), amount=Decimal('50.00'))
+                for _ in range(10)
+            ],
+        )
+
+    def test_full_payment_history_follows_payment_count(self):
+        def history_buttons():
+            cache.clear()
+            return self.client.get(reverse('crm_view')).content.decode().count('Show full history')
+
+        # Extra payments on the previewed orders are all in the preview.
+        for order in self.customer.orders.all():
+            Payment.objects.create(order=order, amount=Decimal('50.00'))
+        self.assertEqual(history_buttons(), 0)
+
+        # Six orders, only the five previewed ones paid: the order history is cut short,
+        # the payment history is not.
+        customer = self.add_customers(1, orders=0, start=1)[0]
+        oldest = make_order(customer, self.service)
+        for _ in range(5):
+            Payment.objects.create(order=make_order(customer, self.service), amount=Decimal('100.00'))
+        self.assertEqual(history_buttons(), 1)
+
+        Payment.objects.create(order=oldest, amount=Decimal('10.00'))
+        self.assertEqual(history_buttons(), 2)
+
+
+class CustomerLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.juan = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.maria = Customer.objects.create(name="Maria Santos", contact_number="+63 918 765 4321")
+
+    def test_find_existing_matches_name_and_phone(self):
+        self.assertEqual(Customer.objects.find_existing("JUAN  dela Cruz.", "+63 917 123 4567"), self.juan)
+        self.assertEqual(Customer.objects.find_existing("Juan Dela Cruz", ""), self.juan)
+
+    def test_find_existing_ignores_same_name_with_other_phone(self):
+        self.assertIsNone(Customer.objects.find_existing("Juan Dela Cruz", "09990000000"))
+
+    def test_autocomplete_by_phone_prefix(self):
+        self.assertEqual(list(Customer.objects.autocomplete("0917")), [self.juan])
+        self.assertEqual(list(Customer.objects.autocomplete("+63 918")), [self.maria])
+
+    def test_autocomplete_needs_digits_past_the_trunk_prefix(self):
+        for query in ['0', '63', '+63', '(0)']:
+            with self.subTest(query=query):
+                self.assertEqual(list(Customer.objects.autocomplete(query)), [])
+
+
+class DormantCustomerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        service = Service.objects.create(name="Sticker Printing")
+        cls.never = Customer.objects.create(name="Never Ordered", contact_number="09170000001")
+        cls.idle = Customer.objects.create(name="Long Idle", contact_number="09170000002")
+        cls.active = Customer.objects.create(name="Recent Buyer", contact_number="09170000003")
+        make_order(cls.idle, service)
+        make_order(cls.active, service)
+        Customer.objects.filter(pk=cls.idle.pk).update(last_order_at=timezone.now() - timedelta(days=200))
+
+    def test_dormant_includes_customers_without_orders(self):
+        dormant = Customer.objects.dormant(timezone.now() - timedelta(days=90))
+        self.assertEqual(list(dormant), [self.never, self.idle])
+
+    def test_crm_dormant_sort_lists_them(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('crm_view'), {'sort': 'dormant'})
+        self.assertEqual(
+            [customer.pk for customer in response.context['customers']], [self.never.pk, self.idle.pk]
+        )
+        self.assertEqual(response.context['today'], timezone.localdate())
+
+
+class ServiceCatalogueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.service = Service.objects.create(name="Tarpaulin Printing")
+        cls.size = CustomizationOption.objects.create(name="size")
+        cls.service.customization_options.add(cls.size)
+        cls.option = PricingOption.objects.create(
+            service=cls.service, customization_option=cls.size, description="3x4 ft", price=Decimal('150.00'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # Versions restart with each test's rollback; start without a cached document.
+        patcher = mock.patch('system.catalogue._cached', (None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def customization_names(self):
+        return [customization['name'] for customization in get_catalogue()['services'][0]['customizations']]
+
+    def test_document_is_reused_until_the_version_moves(self):
+        document = get_catalogue()
+        with self.assertNumQueries(1):  # the version
+            self.assertIs(get_catalogue(), document)
+
+        self.option.price = Decimal('175.00')
+        self.option.save()
+        rebuilt = get_catalogue()
+        self.assertIsNot(rebuilt, document)
+        self.assertGreater(rebuilt['version'], document['version'])
+        self.assertEqual(rebuilt['services'][0]['customizations'][0]['pricing_options'][0]['price'], '175.00')
+
+    def test_customization_options_changes_rebuild(self):
+        self.assertEqual(self.customization_names(), ["size"])
+        color = CustomizationOption.objects.create(name="color")
+        self.service.customization_options.add(color)
+        self.assertEqual(self.customization_names(), ["size", "color"])
+        self.service.customization_options.remove(self.size)
+        self.assertEqual(self.customization_names(), ["color"])
+        self.service.customization_options.clear()
+        self.assertEqual(self.customization_names(), [])
+
+    def test_unchanged_catalogue_returns_not_modified(self):
+        response = self.client.get(reverse('service_catalogue'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(reverse('service_catalogue'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.service.customization_options.add(CustomizationOption.objects.create(name="color"))
+        response = self.client.get(reverse('service_catalogue'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['services'][0]['customizations']), 2)
+
+
+class QuoteEstimatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.service = Service.objects.create(name="Tarpaulin Printing")
+        size = CustomizationOption.objects.create(name="size")
+        cls.service.customization_options.add(size)
+        cls.option = PricingOption.objects.create(
+            service=cls.service, customization_option=size, description="3x4 ft", price=Decimal('150.00'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post(self, quotes):
+        return self.client.post(reverse('quote_estimates'), {'quotes': quotes}, content_type='application/json')
+
+    def item(self, quantity=1):
+        return {'pricing_option_id': self.option.pk, 'quantity': quantity}
+
+    def test_quotes_a_line(self):
+        response = self.post([{'service_id': self.service.pk, 'items': [self.item(3)]}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['quotes'][0]['total'], '450.00')
+
+    def test_malformed_quotes_are_rejected(self):
+        for quotes in [
+            [{'service_id': self.service.pk, 'items': 5}],
+            [{'service_id': self.service.pk, 'items': [5]}],
+            [{'service_id': self.service.pk, 'items': 'abc'}],
+            ['not a quote'],
+        ]:
+            with self.subTest(quotes=quotes):
+                response = self.post(quotes)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_out_of_range_quantities_are_line_errors(self):
+        for quantity in ['1e30', '1.5', '-1', 'NaN', '1000001']:
+            with self.subTest(quantity=quantity):
+                response = self.post([{'service_id': self.service.pk, 'items': [self.item(quantity)]}])
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('quantity', response.json()['quotes'][0]['error'])
+
+
+class SetupDraftStoreTests(TestCase):
+    def test_append_adds_at_the_end(self):
+        draft = SetupDraftStore('draft')
+        self.assertEqual([draft.append('equipment', {'name': name}) for name in 'abc'], [0, 1, 2])
+        self.assertEqual(draft.items('equipment'), [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+
+    def test_append_retries_a_position_taken_concurrently(self):
+        draft = SetupDraftStore('draft')
+        draft.append('equipment', {'name': 'first'})
+        real_next_position = draft._next_position
+        # The first read races with another request and returns the taken position 0.
+        with mock.patch.object(draft, '_next_position', side_effect=[0, real_next_position('equipment')]):
+            position = draft.append('equipment', {'name': 'second'})
+
+        self.assertEqual(position, 1)
+        self.assertEqual(draft.items('equipment'), [{'name': 'first'}, {'name': 'second'}])
+
+
+class ProductionBoardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.service = Service.objects.create(name="Sticker Printing")
+        Equipment.objects.create(name="Cutter", condition='working')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_orders(self, count):
+        for index in range(count):
+            customer = Customer.objects.create(name=f"Customer {index}", contact_number=f"0917{index:07}")
+            make_order(customer, self.service)
+
+    def test_page_query_count_does_not_grow_with_the_queue(self):
+        self.add_orders(3)
+        self.client.get(reverse('production'))  # fills the picker cache
+        # Session, user, the picker cache generations, then the queue with its positions.
+        with self.assertNumQueries(4):
+            self.client.get(reverse('production'))
+
+        self.add_orders(20)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('production'))
+        self.assertEqual(len(response.context['orders']), 23)
+
+    def test_setup_import_refreshes_the_equipment_picker(self):
+        self.client.get(reverse('production'))
+        with self.captureOnCommitCallbacks(execute=True):
+            import_setup_data({'equipment': [{'name': "Laminator", 'condition': 'new'}]})
+
+        response = self.client.get(reverse('production'))
+        self.assertEqual(
+            [equipment['name'] for equipment in response.context['equipment_list']], ["Cutter", "Laminator"]
+        )
+
+
+class EquipmentMaterialsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.equipment = Equipment.objects.create(name="Large Format Printer", condition='working')
+        cls.category = InventoryCategory.objects.create(category_name="Vinyl")
+        cls.category.associated_equipment.add(cls.equipment)
+
+    def setUp(self):
+        get_equipment_materials()  # cache the mapping before the bulk import
+
+    def material_names(self):
+        return [material['name'] for material in materials_for_equipment(self.equipment.pk)]
+
+    def test_setup_import_refreshes_the_mapping(self):
+        import_setup_data({'inventory': {"Vinyl": [
+            {'name': "Matte 10oz", 'stock_level': 20, 'reorder_threshold': 5, 'unit': 'meters'},
+        ]}})
+        self.assertEqual(self.material_names(), ["Matte 10oz"])
+
+    def test_inventory_import_refreshes_the_mapping(self):
+        InventoryImporter().run([(2, {
+            'name': "Glossy 13oz", 'category': "Vinyl", 'stock_level': '10',
+            'reorder_threshold': '2', 'unit_of_measurement': 'meters', 'supplier': '',
+        })])
+        self.assertEqual(self.material_names(), ["Glossy 13oz"])
+
+
+class SaveQualityCheckTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        order = make_order(customer, Service.objects.create(name="Sticker Printing"), 'IN PROGRESS')
+        cls.job = Production.objects.create(order=order, equipment_assigned=[], status='IN_PROGRESS')
+        QualityCheck.objects.create(job=cls.job, parameter="Color", result='pass')
+        QualityCheck.objects.create(job=cls.job, parameter="Size", result='fail')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def save(self, url_parameter, **data):
+        return self.client.post(reverse('save_quality_check', args=[self.job.pk, url_parameter]), data)
+
+    def test_saves_and_renames_a_check(self):
+        response = self.save("Size", parameter="Dimensions", result='pass')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['save_type'], "Modified")
+        self.assertEqual(
+            sorted(QualityCheck.objects.filter(job=self.job).values_list('parameter', 'result')),
+            [("Color", 'pass'), ("Dimensions", 'pass')],
+        )
+
+    def test_renaming_onto_an_existing_check_is_a_conflict(self):
+        response = self.save("Size", parameter="Color", result='pass')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(QualityCheck.objects.get(job=self.job, parameter="Size").result, 'fail')
+
+    def test_unknown_result_is_rejected(self):
+        response = self.save("Color", result='maybe')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(QualityCheck.objects.get(job=self.job, parameter="Color").result, 'pass')
+
+
+class SubmitProductionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        cls.order = make_order(customer, Service.objects.create(name="Sticker Printing"))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def submit(self, quality_checks):
+        return self.client.post(reverse('submit_production'), {
+            'order': self.order.pk, 'priority': 'HIGH', 'equipment_assigned': '[]',
+            'quality_checks': json.dumps(quality_checks),
+        })
+
+    def test_creates_job_with_its_checks(self):
+        response = self.submit([
+            {'parameter': "Color", 'result': 'fail'},
+            {'parameter': "Size"},
+            {'parameter': "Color", 'result': 'pass', 'notes': "Rechecked"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        job = Production.objects.get(order=self.order)
+        self.assertEqual(
+            list(QualityCheck.objects.for_job(job.pk)),
+            [
+                {'parameter': "Color", 'result': 'pass', 'notes': "Rechecked"},
+                {'parameter': "Size", 'result': 'on_progress', 'notes': ""},
+            ],
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'IN PROGRESS')
+
+    def test_invalid_checks_are_rejected_before_anything_is_written(self):
+        for quality_checks in [
+            [{'parameter': "Color", 'result': 'maybe'}],
+            ["Color"],
+            [{'result': 'pass'}],
+            [{'parameter': ["Color"]}],
+            {'parameter': "Color"},
+        ]:
+            with self.subTest(quality_checks=quality_checks):
+                self.assertEqual(self.submit(quality_checks).status_code, 400)
+        response = self.client.post(reverse('submit_production'), {'order': self.order.pk, 'quality_checks': '[{'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Production.objects.exists())
+        self.assertFalse(QualityCheck.objects.exists())
+
+
+class QualityFailRateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        customer = Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567")
+        for service_name, results in [
+            ("Sticker Printing", {"Color": 'fail', "Size": 'pass'}),
+            ("Sticker Printing", {"Color": 'pass', "Size": 'on_progress'}),
+            ("Tarpaulin Printing", {"Color": 'fail', "Size": 'fail'}),
+        ]:
+            service, _ = Service.objects.get_or_create(name=service_name)
+            job = Production.objects.create(order=make_order(customer, service), equipment_assigned=[])
+            for parameter, result in results.items():
+                QualityCheck.objects.create(job=job, parameter=parameter, result=result)
+
+    def test_fail_rates_per_parameter(self):
+        self.assertEqual(
+            [(row['parameter'], row['total'], row['failed']) for row in QualityCheck.objects.fail_rates('parameter')],
+            [("Color", 3, 2), ("Size", 3, 1)],
+        )
+        rates = {row['parameter']: row['fail_rate'] for row in QualityCheck.objects.fail_rates('parameter')}
+        self.assertAlmostEqual(rates["Color"], 2 / 3)
+
+    def test_endpoint_ignores_checks_in_progress(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('quality_fail_rates'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [(row['parameter'], row['total'], row['failed'], row['fail_rate']) for row in data['by_parameter']],
+            [("Color", 3, 2, 2 / 3), ("Size", 2, 1, 0.5)],
+        )
+        self.assertEqual(
+            [(row['service'], row['total'], row['failed'], row['fail_rate']) for row in data['by_service']],
+            [("Tarpaulin Printing", 2, 2, 1.0), ("Sticker Printing", 3, 1, 1 / 3)],
+        )
+
+
+class ImportMasterDataTests(TestCase):
+    """One bad row per importer: it is reported with its line number and the rest is written."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_file(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def import_file(self, kind, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_master_data', kind, path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_services_csv(self):
+        path = self.write_file('services.csv', (
+            "name,customization_options\n"
+            "Tarpaulin Printing,size|finish\n"
+            "TP,size\n"
+            "Sticker Printing,\n"
+        ))
+        stdout, stderr = self.import_file('services', path)
+        self.assertIn("line 3: name:", stderr)
+        self.assertIn("2 services rows imported, 0 skipped as duplicates, 1 rejected", stdout)
+        self.assertEqual(
+            sorted(Service.objects.get(name="Tarpaulin Printing").customization_options.values_list('name', flat=True)),
+            ["finish", "size"],
+        )
+        self.assertFalse(Service.objects.get(name="Sticker Printing").customization_options.exists())
+
+    def test_pricing_jsonl(self):
+        Service.objects.create(name="Tarpaulin Printing")
+        path = self.write_file('pricing.jsonl', (
+            '{"service": "Tarpaulin Printing", "customization_option": "Size", "description": "3x4 ft", "price": "150.00"}\n'
+            '{"service": "Mug Printing", "customization_option": "Size", "description": "11 oz", "price": "90.00"}\n'
+        ))
+        stdout, stderr = self.import_file('pricing', path)
+        self.assertIn("line 2: service: Unknown service 'Mug Printing'.", stderr)
+        self.assertIn("1 pricing rows imported, 0 skipped as duplicates, 1 rejected", stdout)
+        option = PricingOption.objects.get()
+        self.assertEqual((option.customization_option.name, option.price), ("size", Decimal('150.00')))
+        self.assertTrue(option.service.customization_options.filter(name="size").exists())
+
+    def test_inventory_csv(self):
+        path = self.write_file('inventory.csv', (
+            "name,category,stock_level,reorder_threshold,unit_of_measurement,supplier\n"
+            "Matte 10oz,Vinyl,20,5,meters,Acme Supplies\n"
+            "Steel Sheet,Metal,4,1,pcs,\n"
+        ))
+        stdout, stderr = self.import_file('inventory', path)
+        self.assertIn("line 3: category: Invalid category selected.", stderr)
+        self.assertIn("1 inventory rows imported, 0 skipped as duplicates, 1 rejected", stdout)
+        material = Inventory.objects.get()
+        self.assertEqual((material.category.category_name, material.supplier.supplier_name), ("Vinyl", "Acme Supplies"))
+
+    def test_suppliers_jsonl(self):
+        path = self.write_file('suppliers.jsonl', (
+            '{"supplier_name": "Acme Supplies", "email": "sales@acme.example"}\n'
+            '{"supplier_name": "Broken\n'
+            '\n'
+            '{"supplier_name": "Inkworks", "email": "hello@inkworks.example"}\n'
+        ))
+        stdout, stderr = self.import_file('suppliers', path)
+        self.assertIn("line 2: not a JSON object", stderr)
+        self.assertIn("2 suppliers rows imported, 0 skipped as duplicates, 1 rejected", stdout)
+        self.assertEqual(sorted(Supplier.objects.values_list('supplier_name', flat=True)), ["Acme Supplies", "Inkworks"])
+
+    def customers_csv(self):
+        Customer.objects.create(name="Juan Dela Cruz", contact_number="09171234567", email="juan@example.com")
+        return self.write_file('customers.csv', (
+            "name,contact_number,email,address\n"
+            "Juan Dela Cruz,+639171234567,juan@example.com,Manila\n"  # existing customer
+            "Maria Santos,09187654321,maria@example.com,Cebu\n"
+            "Pedro Reyes,12ab,pedro@example.com,Davao\n"
+            "Maria Santos,09187654321,maria@example.com,Cebu\n"  # repeated row
+            "Ana Lopez,09190000000,ana@example.com,Iloilo\n"
+        ))
+
+    def test_customers_csv_skips_existing_and_repeated_rows(self):
+        stdout, stderr = self.import_file('customers', self.customers_csv(), '--batch-size', '10')
+        self.assertIn("line 4: contact_number:", stderr)
+        self.assertIn("2 customers rows imported, 2 skipped as duplicates, 1 rejected", stdout)
+        self.assertEqual(
+            sorted(Customer.objects.values_list('name', flat=True)), ["Ana Lopez", "Juan Dela Cruz", "Maria Santos"]
+        )
+        self.assertEqual(Customer.objects.get(name="Maria Santos").phone_key, "9187654321")
+
+    def test_dry_run_validates_without_writing(self):
+        stdout, stderr = self.import_file('customers', self.customers_csv(), '--dry-run')
+        self.assertIn("line 4: contact_number:", stderr)
+        self.assertIn("4 customers rows validated, 0 skipped as duplicates, 1 rejected", stdout)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_rows_are_streamed_and_written_in_batches(self):
+        path = self.customers_csv()
+        read = import_master_data.read_rows
+        pulled, batches = [], []
+
+        def counting_rows(*args):
+            for row in read(*args):
+                pulled.append(row)
+                yield row
+
+        def write(importer, items):
+            batches.append((len(pulled), len(items)))
+            return len(items)
+
+        with mock.patch.object(import_master_data, 'read_rows', counting_rows), \
+                mock.patch.object(CustomerImporter, 'write', autospec=True, side_effect=write):
+            stdout, _ = self.import_file('customers', path, '--batch-size', '2')
+
+        # Each batch is written once its rows are read, before the rest of the file.
+        self.assertEqual(batches, [(2, 2), (4, 1), (5, 1)])
+        self.assertIn("4 customers rows imported, 0 skipped as duplicates, 1 rejected", stdout)
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            self.import_file('customers', self.customers_csv(), '--batch-size', '0')
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from django.db.models import Q
+from .models import Order, Production
+from .search import get_search_backend, search_terms
+
+
+class TypeaheadCache:
+    """
+    Small in-process LRU cache with a short TTL, keyed on the normalized query.
+
+    Concurrent misses for the same key are coalesced: the first request computes the
+    result while the others wait for it, so a burst of identical keystroke queries
+    reaches the database once. `clear()` is called from the search-index signal
+    receivers, so the TTL only bounds staleness across worker processes.
+    """
+    def __init__(self, maxsize=256, ttl=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> threading.Event
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[1]
+
+                event = self._inflight.get(key)
+                is_leader = event is None
+                if is_leader:
+                    event = self._inflight[key] = threading.Event()
+                    generation = self._generation
+
+            if not is_leader:
+                # Another request is computing this key; use its result once it lands.
+                event.wait(timeout=self.ttl)
+                continue
+
+            try:
+                value = compute()
+                with self._lock:
+                    if generation == self._generation:
+                        self._entries[key] = (time.monotonic() + self.ttl, value)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.maxsize:
+                            self._entries.popitem(last=False)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+typeahead_cache = TypeaheadCache()
+
+
+def normalize_query(query):
+    return ' '.join(search_terms(query))
+
+
+def cached_order_ids(query, limit=10):
+    """Ranked ids from the order search index, served from the typeahead cache."""
+    normalized = normalize_query(query)
+    if not normalized:
+        return []
+    return typeahead_cache.get_or_compute(
+        ('order_ids', normalized, limit),
+        lambda: get_search_backend().search(normalized, limit=limit),
+    )
+
+
+def job_id_prefix_filter(prefix, max_job_id):
+    """
+    Match job ids whose decimal form starts with `prefix` as a handful of primary-key
+    ranges (12 -> 12, 120..129, 1200..1299, ...) instead of casting the key to text.
+    `prefix` must be a string of decimal digits.
+    """
+    if not prefix.isdecimal():
+        raise ValueError(f"Not a job id prefix: {prefix!r}")
+    start = int(prefix)
+    # Job ids never start with 0, and a start of 0 would never widen past max_job_id.
+    if int(prefix[0]) == 0 or start > max_job_id:
+        return Q(pk__in=[])
+    condition = Q(job_id=start)
+    width = 10
+    while start * width <= max_job_id:
+        condition |= Q(job_id__gte=start * width, job_id__lt=(start + 1) * width)
+        width *= 10
+    return condition
+
+
+def production_jobs(query, limit=10):
+    """
+    Production jobs matching `query`: a number matches job ids by prefix, text matches
+    the jobs of orders found by the order search index.
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return Production.objects.none()
+
+    if normalized.isdecimal():
+        max_job_id = Production.objects.order_by('-job_id').values_list('job_id', flat=True).first() or 0
+        return Production.objects.filter(job_id_prefix_filter(normalized, max_job_id)).order_by('job_id')[:limit]
+
+    order_ids = cached_order_ids(normalized, limit=limit)
+    return Production.objects.filter(order_id__in=order_ids).order_by('-job_id')[:limit]
+
+
+def order_suggestions(query, limit=10):
+    normalized = normalize_query(query)
+
+    def compute():
+        order_ids = cached_order_ids(normalized, limit=limit)
+        rows = {
+            row['order_id']: row for row in Order.objects.filter(order_id__in=order_ids).values(
+                'order_id', 'status', 'customer__name', 'service__name'
+            )
+        }
+        return [
+            {
+                'id': order_id,
+                'label': f"Order #{order_id} - {rows[order_id]['customer__name']}",
+                'service': rows[order_id]['service__name'],
+                'status': rows[order_id]['status'],
+            }
+            for order_id in order_ids if order_id in rows
+        ]
+
+    return typeahead_cache.get_or_compute(('orders', normalized, limit), compute)
+
+
+def production_suggestions(query, limit=10):
+    normalized = normalize_query(query)
+
+    def compute():
+        jobs = production_jobs(normalized, limit=limit).values(
+            'job_id', 'status', 'priority', 'order__customer__name'
+        )
+        return [
+            {
+                'id': job['job_id'],
+                'label': f"Job #{job['job_id']} - {job['order__customer__name']}",
+                'status': job['status'],
+                'priority': job['priority'],
+            }
+            for job in jobs
+        ]
+
+    return typeahead_cache.get_or_compute(('production', normalized, limit), compute)
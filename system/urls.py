@@ -20,6 +20,8 @@ urlpatterns = [
 
     path('verify-superuser/', views.verify_superuser, name='verify_superuser'),
     path('dashboard', views.dashboard, name="dashboard"),  
+    path('dashboard/kpis/', views.dashboard_kpis_json, name="dashboard_kpis"),
+    path('dashboard/charts/', views.dashboard_charts_json, name="dashboard_charts"),
     
     path('orders', views.orders_view, name="orders"),
     path('authorize-cancel/', views.authorize_cancel, name='authorize_cancel'),
@@ -27,6 +29,7 @@ urlpatterns = [
     path('refresh-order-queue/', views.refresh_order_queue, name='refresh_order_queue'),
     path('orders/<int:order_id>/cancel/', views.cancel_order, name='cancel_order'),
     path('get_paginated_orders/', views.get_paginated_orders, name='get_paginated_orders'),
+    path('orders/catalogue/', views.service_catalogue, name='service_catalogue'),
     path('get-customization-options/', views.get_customization_options, name='get_customization_options'),
     path('get-pricing-options/', views.get_pricing_options, name='get_pricing_options'),
     path('orders/search/', views.search_orders, name='search_orders'),
@@ -39,7 +42,9 @@ urlpatterns = [
     path("fetch/quality-checks/<int:production_id>/", views.fetch_quality_checks, name="fetch_quality_checks"),
     path('get_quality_check/<int:job_id>/<str:parameter>/', views.get_quality_check, name='get_quality_check'),
     path('save_quality_check/<int:job_id>/<str:parameter>/', views.save_quality_check, name='save_quality_check'),
+    path('production/quality/fail-rates/', views.quality_fail_rates, name='quality_fail_rates'),
     path("production/search/", views.search_production, name="search_production"),
+    path("typeahead/", views.typeahead, name="typeahead"),
     path("inventory/management/", views.inventory_management, name="inventory_management"),
     path("inventory/alerts/", views.inventory_alerts, name="inventory_alerts"),
     path("contact-supplier/", views.contact_supplier, name="contact_supplier"),
@@ -49,5 +54,8 @@ urlpatterns = [
     path('new_payment/', views.new_payment, name='new_payment'),
 
     path('crm/', views.crm_view, name='crm_view'),
-    path('estimates/v2', views.estimatesv2, name="estimatesv2"),   
+    path('customers/autocomplete/', views.customer_autocomplete, name='customer_autocomplete'),
+    path('crm/<int:customer_id>/history/', views.crm_customer_history, name='crm_customer_history'),
+    path('estimates/v2', views.estimatesv2, name="estimatesv2"),
+    path('estimates/quote/', views.quote_estimates, name="quote_estimates"),   
 ]
\ No newline at end of file
@@ -20,10 +20,18 @@ from .models import (
 )
 from .forms import CustomUserCreationForm, AuthenticationForm, BusinessDetailsForm, ServiceForm
 from .forms import PricingOptionForm, EquipmentForm, InventoryForm, SupplierForm, CustomerForm, SystemSettingsForm, OrderForm
+from .setup_state import SetupState
+from .setup_draft import SetupDraftStore
+from .setup_import import import_setup_data
+from .pagination import paginate_archive
+from .typeahead import cached_order_ids, normalize_query, order_suggestions, production_jobs, production_suggestions
+from .order_queue import next_queue_rank, leave_queue, reorder_queue, QueueConflict
+from .fragments import FRAGMENT_TIMEOUT, generations
+from .catalogue import catalogue_version, get_catalogue
 
 # Kinda useless maderfacker now
 def admin_auth(request): #Check if there's a superuser in the User Model 
-  if User.objects.filter(is_staff=True, is_active=True, is_superuser=True).exists():
+  if SetupState.superuser_exists():
     return redirect('login')
   else:
     return redirect('admin_signup')
@@ -82,10 +90,8 @@ class SignUpView(SuccessMessageMixin, CreateView):
         return self.render_to_response(self.get_context_data(form=form))
 
 def business_details(request):
-    session_data = request.session.get('business_details', {})
-    
-    if 'business_details' in request.session:
-        # print("Session Data:", request.session['business_details'])
+    draft = SetupDraftStore.for_request(request)
+    session_data = draft.get('business_details', {})
 
     if request.method == 'GET':
         form = BusinessDetailsForm(initial=session_data)
@@ -94,20 +100,16 @@ def business_details(request):
     elif request.method == 'POST':
         form = BusinessDetailsForm(request.POST, request.FILES)
         if form.is_valid():
-            request.session['business_details'] = form.cleaned_data
+            draft.set('business_details', form.cleaned_data)
             return redirect('services_and_pricing')
         else:
             return render(request, 'setup/business_details.html', {'form': form})
 
 def services_and_pricing(request):
-    if 'services_data' not in request.session:
-        request.session['services_data'] = []
-
-    # print(request.session.get('services_data'))
+    # Each service is one SetupDraft row; adding a pricing option rewrites only that row.
+    draft = SetupDraftStore.for_request(request)
 
-    unlocked=False
-    if(request.session['services_data'] != []):
-        unlocked=True
+    unlocked = draft.has_items('service')
 
     # Service Form
     service_form = ServiceForm()
@@ -126,19 +128,12 @@ def services_and_pricing(request):
                     'customization_options': customization_options,
                 }
 
-                services_data = request.session.get('services_data', [])
-                services_data.append(service_data)
-                request.session['services_data'] = services_data
-
-                # Optionally keep the current_service for additional processing
-                request.session['current_service'] = service_data
-                request.session.modified = True 
+                draft.append('service', service_data)
 
                 success_message = f"Service: '{service_data['name']}' added successfully!"
 
                 additional_data = {"reload_script": True}
                 unlocked = {"unlocked": True}
-                # print("Updated services_data:", request.session['services_data'])
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({
                         'status': 'success',
@@ -154,10 +149,6 @@ def services_and_pricing(request):
                     })
 
         elif 'add_pricing_option' in request.POST:
-              services_data = request.session.get('services_data', [])
-              print("Services Data:", services_data)
-              print("Type of services_data:", type(services_data))
-
               service_index = request.POST.get('service_index')
               customization_option_name = request.POST.get('customization_option')
               description = request.POST.get('description')
@@ -168,36 +159,27 @@ def services_and_pricing(request):
               except (TypeError, ValueError):
                   return JsonResponse({'status': 'error', 'message': 'Invalid service index provided.'})
 
-              if service_index >= len(services_data):
+              pricing_data = {
+                  'description': description,
+                  'price': float(price) if price else 0.0,
+              }
+              found = []
+
+              def add_pricing_option(service_data):
+                  customization_option = next(
+                      (opt for opt in service_data['customization_options'] if opt['name'] == customization_option_name),
+                      None
+                  )
+                  if customization_option:
+                      customization_option.setdefault('pricing_options', []).append(pricing_data)
+                      found.append(customization_option)
+
+              if draft.update_item('service', service_index, add_pricing_option) is None:
                   return JsonResponse({'status': 'error', 'message': 'Service index out of range.'})
 
-              current_service = services_data[service_index]
-            #   print("Current Service:", current_service)
-
-              customization_option = next(
-                  (opt for opt in current_service['customization_options'] if opt['name'] == customization_option_name),
-                  None
-              )
-
-              if customization_option:
-                  print("Customization Option Found:", customization_option)
-                  
-                  pricing_data = {
-                      'description': description,
-                      'price': float(price) if price else 0.0,
-                  }
-
-                  customization_option.setdefault('pricing_options', []).append(pricing_data)
-
-                  request.session['services_data'] = services_data
-                  request.session.modified = True
-
-                #   print("Updated Service Data:", services_data)
-
-                  service_tabs_html = render_to_string('setup/partials/service_tabs.html', {'services_data': services_data})
-                  # print("Updated Service Tabs HTML:", service_tabs_html)  # Debugging
+              if found:
+                  service_tabs_html = render_to_string('setup/partials/service_tabs.html', {'services_data': draft.items('service')})
                   if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                      print("Ajax Operation")
                       return JsonResponse({
                           'status': 'success',
                           'add_pricing_option': True,
@@ -205,8 +187,6 @@ def services_and_pricing(request):
                           'success_message': 'Pricing option added successfully!',
                           'active_tab_index': service_index,
                       })
-                  else:
-                      print("Not Ajax Operation")
               else:
                   return JsonResponse({
                       'status': 'error',
@@ -214,18 +194,12 @@ def services_and_pricing(request):
                   })
 
         elif 'save_service' in request.POST:
-            current_service = request.session.pop('current_service', None)
-            if current_service:
-              services_data = request.session.get('services_data', [])
-              if current_service not in services_data:
-                  services_data.append(current_service)
-                  request.session['services_data'] = services_data
-                  request.session.modified = True
+            # Services are stored as they are added; this only refreshes the tabs.
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
               return JsonResponse({
                   'status': 'success',
                   'confirm_services': True,
-                  'service_tabs_html': render_to_string('setup/partials/service_tabs.html', {'services_data': request.session['services_data']}), 
+                  'service_tabs_html': render_to_string('setup/partials/service_tabs.html', {'services_data': draft.items('service')}), 
               })
         if 'revert_to_service' in request.POST:
             additional_data = {"reload_script": True}
@@ -235,7 +209,6 @@ def services_and_pricing(request):
                 {'service_form': ServiceForm(), **additional_data}
             )
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-              print("Ajax Reverted")
               return JsonResponse({
                 'status': 'success',
                 'newTagtify': True,
@@ -247,30 +220,20 @@ def services_and_pricing(request):
         'unlocked': unlocked,
         'service_form': service_form,
         'pricing_option_form': pricing_option_form,
-        'current_service': request.session.get('current_service', {}),
-        'services_data': request.session.get('services_data', []),
+        'services_data': draft.items('service'),
     })
 
 
 def equipment(request):
-    # request.session['equipment'] = []
-    # For debugging: Display session data
-    if 'equipment' in request.session:
-        print("Equipment Data:", request.session['equipment'])
+    draft = SetupDraftStore.for_request(request)
 
-    if 'equipment' not in request.session:
-        request.session['equipment'] = []
-
-    unlocked=False
-    if(request.session['equipment'] != []):
-        unlocked=True
+    unlocked = draft.has_items('equipment')
 
     if request.method == 'POST':
         form = EquipmentForm(request.POST)
         if form.is_valid():
             equipment_data = form.cleaned_data
-            request.session['equipment'].append(equipment_data)
-            request.session.modified = True
+            draft.append('equipment', equipment_data)
 
             messages.success(request, f"Equipment '{equipment_data['name']}' added successfully!")
             return redirect('equipment')
@@ -283,67 +246,43 @@ def equipment(request):
     return render(request, 'setup/equipment.html', {'form': form, 'unlocked': unlocked})
 
 def inventory_and_category(request):
-    #  request.session['inventory'] = {}
-    
-    if 'inventory' in request.session:
-        print("Inventory Data:", request.session['inventory'])
-    
-    if 'inventory' not in request.session:
-        request.session['inventory'] = {}
-        
-    unlocked=False
-    if(request.session['inventory'] != {}):
-        unlocked=True
-
-    inventory_data = request.session.get('inventory', {})
+    draft = SetupDraftStore.for_request(request)
 
-    categories = []
-    for category_name, items in inventory_data.items():
-        categories.append({
-            'category_name': category_name,
-            'materials': items
-        })
-    
     if request.method == 'POST':
         form = InventoryForm(request.POST)
         if form.is_valid():
-            print("Valid!")
             inventory_data = form.cleaned_data
             
             category = inventory_data['category']
-            if category not in request.session['inventory']:
-                request.session['inventory'][category] = []
-            
-            request.session['inventory'][category].append({
+            draft.append('material', {
+                'category': category,
                 'name': inventory_data['name'],
                 'unit': inventory_data['unit_of_measurement'],
                 'stock_level': inventory_data['stock_level'],
                 'reorder_threshold': inventory_data['reorder_threshold'],
                 'supplier': inventory_data['supplier'],
-                
             })
-            request.session.modified = True
             messages.success(request, f"{inventory_data['name']} added successfully to {category}!")
-            print("sds")
             return redirect('inventory_and_category')
         else:
             return render(request, 'setup/inventory_and_category.html', {'form': form})
     else:
         form = InventoryForm()
 
+    categories = {}
+    for material in draft.items('material'):
+        category_name = material.pop('category')
+        categories.setdefault(category_name, {'category_name': category_name, 'materials': []})['materials'].append(material)
+
     return render(request, 'setup/inventory_and_category.html', {
-        'unlocked': unlocked,
+        'unlocked': bool(categories),
         'form': form,
-        'categories': categories,
+        'categories': list(categories.values()),
     })
 
 # # views.py (Supplier) OPTIONAL
 def supplier(request):
-    if 'supplier' in request.session:
-        print("Supplier Data:", request.session['supplier'])
-
-    if 'supplier' not in request.session:
-                request.session['supplier'] = []
+    draft = SetupDraftStore.for_request(request)
 
     unlocked=True
     if request.method == 'POST':
@@ -351,8 +290,7 @@ def supplier(request):
         if form.is_valid():
             supplier_data = form.cleaned_data
 
-            request.session['supplier'].append(supplier_data)
-            request.session.modified = True
+            draft.append('supplier', supplier_data)
 
             messages.success(request, 'Supplier data saved successfully!')
 
@@ -360,23 +298,13 @@ def supplier(request):
         else:
             return render(request, 'setup/setup.html', {'form': form})
     else:
-        # Check if there's already data in the session
-        # supplier_data = request.session.get('supplier', None)
-        # if supplier_data:
-        #     form = SupplierForm(initial=supplier_data[-1])  # Prefill form with last entry (if any)
-        # else:
             form = SupplierForm()
     return render(request, 'setup/supplier.html', {'form': form, 'unlocked': unlocked})
 
 
 # # views.py (Customer) OPTIONAL
 def customer_prerecords(request):
-    # request.session['customer'] = []
-    if 'customer' in request.session:
-        print("Customer Data:", request.session['customer'])
-
-    if 'customer' not in request.session:
-        request.session['customer'] = []
+    draft = SetupDraftStore.for_request(request)
     
     unlocked=True
     if request.method == 'POST':
@@ -384,8 +312,7 @@ def customer_prerecords(request):
         if form.is_valid():
             customer_data = form.cleaned_data
             
-            request.session['customer'].append(customer_data)
-            request.session.modified = True
+            draft.append('customer', customer_data)
 
             messages.success(request, 'Customer data saved successfully!')
 
@@ -393,9 +320,9 @@ def customer_prerecords(request):
         else:
              return render(request, 'setup/customer_prerecords.html', {'form': form})
     else:
-        customer_data = request.session.get('customer', None)
+        customer_data = draft.last('customer')
         if customer_data:
-            form = CustomerForm(initial=customer_data[-1])
+            form = CustomerForm(initial=customer_data)
         else:
             form = CustomerForm()
 
@@ -403,16 +330,15 @@ def customer_prerecords(request):
 
 # views.py (System Settings)
 def system_settings(request):
-    if 'system_settings' in request.session:
-        print("Settings:", request.session['system_settings'])
+    draft = SetupDraftStore.for_request(request)
     if request.method == "POST":
         form = SystemSettingsForm(request.POST)
         if form.is_valid():
-            request.session['system_settings'] = form.cleaned_data
+            draft.set('system_settings', form.cleaned_data)
 
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
-                    'modal_data': request.session.get('system_settings', {}),
+                    'modal_data': form.cleaned_data,
                     'message': "System settings saved successfully. Please review all data before proceeding.",
                 })
         else:
@@ -423,145 +349,34 @@ def system_settings(request):
     else:
         form = SystemSettingsForm()
     
-    system_settings = request.session.get('system_settings', {})
+    # The review modal shows every step, read from the draft in one query.
+    session_data = draft.as_setup_data()
+    system_settings = session_data['system_settings']
     formatted_settings = {key.replace('_', ' ').capitalize(): value for key, value in system_settings.items()}
-    session_data = {
-        'business_details': request.session.get('business_details', {}),
-        'services_data': request.session.get('services_data', []),
-        'equipment': request.session.get('equipment', []),
-        'inventory': request.session.get('inventory', {}),
-        'supplier': request.session.get('supplier', []),
-        'customer': request.session.get('customer', []),
-        'system_settings': formatted_settings,
-        'smtp': system_settings
-    }
+    session_data['system_settings'] = formatted_settings
+    session_data['smtp'] = system_settings
     return render(request, 'setup/system_settings.html', {
         'form': form,
         'modal_data': session_data,
     })
 
 def save_to_database(request):
-    """Handles saving session data to models when 'Add to Database' is clicked."""
+    """Handles saving the setup draft to models when 'Add to Database' is clicked."""
     try:
-        with transaction.atomic():
-
-            # 1. Save Business Details
-            business_details = request.session.get('business_details', {})
-            if business_details:
-                BusinessDetails.objects.create(
-                    name=business_details['business_name'],
-                    address=business_details['business_address'],
-                    contact_number=business_details['contact_number'],
-                    email=business_details['email'],
-                    tax_identification_number=business_details['tin'],
-                    logo=business_details.get('logo'),
-                )
-
-            # 2. Save Services, Customization Options, and Pricing Options
-            services_data = request.session.get('services_data', [])
-            for service_data in services_data:
-                service = Service.objects.create(name=service_data['name'])
-
-                customization_options = []
-                for option in service_data['customization_options']:
-                    option_name = option['name'].lower()
-
-                    customization_option, _ = CustomizationOption.objects.get_or_create(
-                        name=option_name
-                    )
-                    customization_options.append(customization_option)
-
-                    for pricing in option.get('pricing_options', []):
-                        PricingOption.objects.create(
-                            service=service, 
-                            customization_option=customization_option,
-                            description=pricing['description'],
-                            price=pricing['price'],
-                        )
-
-                service.customization_options.set(customization_options)
-
-
-            # 3. Save Equipment
-            equipment_data = request.session.get('equipment', [])
-            for equipment in equipment_data:
-                Equipment.objects.create(
-                    name=equipment['name'],
-                    description=equipment.get('description'),
-                    condition=equipment['condition'],
-                )
-
-            # 4. Save Inventory and Related Data
-            inventory_data = request.session.get('inventory', {})
-            for category_name, materials in inventory_data.items():
-                category, _ = InventoryCategory.objects.get_or_create(
-                    category_name=category_name
-                )
-                for material in materials:
-                    supplier = None
-                    if material.get('supplier'):
-                        supplier, _ = Supplier.objects.get_or_create(
-                            supplier_name=material['supplier']
-                        )
-
-                    Inventory.objects.create(
-                        name=material['name'],
-                        category=category,
-                        stock_level=material['stock_level'],
-                        reorder_threshold=material['reorder_threshold'],
-                        supplier=supplier,
-                        unit_of_measurement=material['unit'],
-                    )
-
-            # 5. Save Suppliers
-            suppliers_data = request.session.get('supplier', [])
-            for supplier_data in suppliers_data:
-                supplier, created = Supplier.objects.get_or_create(
-                    supplier_name=supplier_data['supplier_name'],
-                    defaults={
-                        'contact_person': supplier_data.get('contact_person'),
-                        'phone_number': supplier_data.get('phone_number'),
-                        'email': supplier_data.get('email'),
-                        'address': supplier_data.get('address'),
-                        'additional_info': supplier_data.get('additional_info'),
-                    },
-                )
-                if not created:
-                    for key, value in supplier_data.items():
-                        if not getattr(supplier, key) and value:
-                            setattr(supplier, key, value)
-                    supplier.save()
-
-            # 6. Save Customers
-            customers_data = request.session.get('customer', [])
-            for customer_data in customers_data:
-                Customer.objects.create(
-                    name=customer_data['name'],
-                    contact_number=customer_data['contact_number'],
-                    email=customer_data['email'],
-                    address=customer_data.get('address', ""),
-                )
-
-            # 7. Save System Settings
-            system_settings = request.session.get('system_settings', {})
-            if system_settings:
-                SystemSettings.objects.update_or_create(
-                    smtp_email=system_settings['smtp_email'],
-                    defaults={
-                        'smtp_server': system_settings['smtp_server'],
-                        'smtp_port': system_settings['smtp_port'],
-                        'smtp_password': system_settings['smtp_password'],
-                    },
-                )
-
-            # Clear session data after saving
-            # request.session.clear()
-            # print("DB Save!")
-            return JsonResponse({
-                'success': True,
-                'message': 'All data has been successfully saved to the database.',
-                'redirect_url': '/dashboard'
-            })
+        # Bulk inserts per stage; the report carries row counts and timings.
+        draft = SetupDraftStore.for_request(request)
+        report = import_setup_data(draft.as_setup_data())
+        draft.clear()
+
+        # Clear session data after saving
+        # request.session.clear()
+        # print("DB Save!")
+        return JsonResponse({
+            'success': True,
+            'message': 'All data has been successfully saved to the database.',
+            'redirect_url': '/dashboard',
+            'report': report,
+        })
 
     except Exception as e:
         logging.error(f"Error saving data to database: {e}")
@@ -571,8 +386,6 @@ def save_to_database(request):
             'message': 'An error occurred while saving the data.'
         })
 
-    return JsonResponse({'success': False, 'message': 'Invalid request method.'})
-
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
 @login_required
@@ -589,18 +402,18 @@ from django.db.models.functions import TruncMonth
 from django.db.models import Sum, Count
 from django.utils.timezone import now
 from .models import Payment, Inventory, Order, Production
+from .metrics import dashboard_charts, dashboard_totals, rollups_updated_at
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+from .kpis import dashboard_kpis
 
 def dashboard(request):
-    total_revenue = Payment.objects.filter(status='PAID').aggregate(total=Sum('amount'))['total'] or 0
-
-    completed_production_orders = Production.objects.filter(status='COMPLETED').values_list('order_id', flat=True)
-    overdue_payments = (
-        Payment.objects.filter(order_id__in=completed_production_orders, status='PENDING')
-        .aggregate(total=Sum('amount'))['total'] or 0
-    )
+    # Totals come from the rollup tables kept by system.metrics; the charts load
+    # afterwards from dashboard_charts_json.
+    metrics = dashboard_totals()
 
+    # Left lazy: the template only runs these on a fragment cache miss.
     low_stock_items = Inventory.objects.filter(stock_level__lt=F('reorder_threshold'))
-    print(low_stock_items)
 
     # recent orders (last 5)
     recent_orders = Order.objects.order_by('-created_at')[:5]
@@ -617,42 +430,59 @@ def dashboard(request):
     )
 
     # print(pending_task_data)
-    # Dynamic data for charts
-    # Revenue over months
-    monthly_revenue = (
-        Payment.objects.filter(status='PAID')
-        .annotate(month=TruncMonth('payment_date'))
-        .values('month')
-        .annotate(total=Sum('amount'))
-        .order_by('month')
-    )
-    revenue_labels = [entry['month'].strftime('%b %Y') for entry in monthly_revenue]
-    revenue_data = [entry['total'] for entry in monthly_revenue]
-
-    order_status_data = Order.objects.values('status').annotate(count=Count('order_id')).order_by('status')
-    order_status_counts = [status['count'] for status in order_status_data]
-    order_status_labels = ['Pending', 'In Progress', 'Completed', 'Cancelled']
-
     context = {
-        'total_revenue': float(total_revenue),
-        'overdue_payments': float(overdue_payments),
+        'total_revenue': float(metrics['total_revenue']),
+        'overdue_payments': float(metrics['overdue_payments']),
         'low_stock_items': low_stock_items,
         'recent_orders': recent_orders,
         'pending_tasks': pending_task_data,
-        'revenue_data': revenue_data,
-        'revenue_labels': revenue_labels,
-        'order_status_data': order_status_counts,
-        'order_status_labels': order_status_labels,
+        'generations': generations(Order, Customer, Payment, Inventory),
+        'fragment_timeout': FRAGMENT_TIMEOUT,
     }
     # print(context)
 
     return render(request, 'dashboard.html', context)
 
 
+
+def _charts_updated_at(request):
+    # condition() asks for the ETag and Last-Modified separately; look the time up once.
+    if not hasattr(request, '_charts_updated_at'):
+        request._charts_updated_at = rollups_updated_at()
+    return request._charts_updated_at
+
+
+def _charts_etag(request):
+    updated_at = _charts_updated_at(request)
+    return quote_etag(f"charts-{updated_at.timestamp()}") if updated_at else None
+
+
+@condition(etag_func=_charts_etag, last_modified_func=_charts_updated_at)
+def dashboard_charts_json(request):
+    """
+    Chart series for the dashboard. Polling clients send If-None-Match and get an empty
+    304 until a payment or order changes the rollups.
+    """
+    response = JsonResponse(dashboard_charts(_charts_updated_at(request)))
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def dashboard_kpis_json(request):
+    kpis = dashboard_kpis()
+    return JsonResponse({
+        'total_revenue': float(kpis['total_revenue']),
+        'overdue_payments': float(kpis['overdue_payments']),
+        'revenue_labels': [month.strftime('%b %Y') for month, total in kpis['revenue_months']],
+        'revenue_data': [float(total) for month, total in kpis['revenue_months']],
+        'order_status_labels': kpis['order_status_labels'],
+        'order_status_data': kpis['order_status_counts'],
+    })
+
+
 from django.db import models
 def orders_view(request):
-    services = Service.objects.all()
-    customers = Customer.objects.all()
+    services = get_catalogue()['services']
 
     if request.method == 'POST':
         customer_name = request.POST.get('name')
@@ -669,21 +499,21 @@ def orders_view(request):
 
             if customer_form.is_valid():
                 customer_data = customer_form.cleaned_data
-                customer, created = Customer.objects.get_or_create(
-                    name=customer_data['name'],
-                    defaults={
-                        'contact_number': customer_data['contact_number'],
-                        'email': customer_data['email'],
-                        'address': customer_data['address'],
-                    }
-                )
+                # Match differently spelled or formatted entries of the same customer
+                customer = Customer.objects.find_existing(customer_data['name'], customer_data['contact_number'])
+                if customer is None:
+                    customer = Customer.objects.create(
+                        name=customer_data['name'],
+                        contact_number=customer_data['contact_number'],
+                        email=customer_data['email'],
+                        address=customer_data['address'],
+                    )
         if order_form.is_valid():
             order = order_form.save(commit=False)
             order.customer = customer
             order.status = 'PENDING'
 
-            max_order_queue = Order.objects.aggregate(max_queue=models.Max('order_queue'))['max_queue'] or 0
-            order.order_queue = max_order_queue + 1
+            order.order_queue = next_queue_rank()
 
             order.save()
 
@@ -702,24 +532,21 @@ def orders_view(request):
         customer_form = CustomerForm()
         order_form = OrderForm()
         
-    pending_progress_orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
-    completed_cancelled_orders = Order.objects.filter(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
+    pending_progress_orders = Order.objects.queue()
+    completed_cancelled_orders = Order.objects.archive()
 
     # Paginate the pending and progress orders - Display 10 orders per page
     paginator_pp = Paginator(pending_progress_orders, 10)
     page_number_pp = request.GET.get('page_pp')
     paginated_pp = paginator_pp.get_page(page_number_pp)
 
-    # Paginate the completed and cancelled orders - Display 10 orders per page
-    paginator_cc = Paginator(completed_cancelled_orders, 10)
-    page_number_cc = request.GET.get('page_cc')
-    paginated_cc = paginator_cc.get_page(page_number_cc)
+    # Completed and cancelled orders use cursor pagination - Display 10 orders per page
+    paginated_cc = paginate_archive(completed_cancelled_orders, request.GET.get('cursor_cc'), 10)
 
     return render(request, 'orders.html', {
         'customer_form': customer_form,
         'order_form': order_form,
         'services': services,
-        'customer': customers,
         'current_date': now().strftime('%B %d, %Y'),
         'pending_progress': paginated_pp,
         'completed_cancelled': paginated_cc,
@@ -735,16 +562,12 @@ def cancel_order(request, order_id, is_authorized=False):
     if order.status != "CANCELLED" and (request.user.is_superuser or is_authorized):
         try:
             order.status = "CANCELLED"
-            order.order_queue = None 
+            leave_queue(order)
             order.completed_or_cancelled = timezone.now()
             order.save()
 
-            pending_progress_orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
-            
-            # Reassign the `order_queue` for each order in the list
-            for index, order in enumerate(pending_progress_orders):
-                order.order_queue = index + 1 
-                order.save()
+            # The orders behind keep their ranks; positions are computed on read.
+            pending_progress_orders = Order.objects.queue()
 
             page_number_pp = request.POST.get('page_pp', 1)
 
@@ -810,27 +633,38 @@ from django.views.decorators.http import require_POST
 def update_order_queue(request):
     if request.user.is_superuser:
         new_order = request.POST.getlist('order[]') 
+        seen_ranks = request.POST.getlist('rank[]')
         
         page_number_pp = int(request.POST.get('page_pp', 1))
-        items_per_page = 10
-        start_position = (page_number_pp - 1) * items_per_page + 1
 
-        for index, order_id in enumerate(new_order):
-            order = Order.objects.get(order_id=order_id)
-            order.order_queue = start_position + index
-            order.save()
+        if not new_order or len(new_order) != len(seen_ranks):
+            return JsonResponse({
+                "success": False,
+                "message": "Invalid order queue submission."
+            }, status=400)
 
-        pending_progress_orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
+        try:
+            reorder_queue(new_order, seen_ranks)
+            success, message, status = True, "Order queue updated successfully.", 200
+        except QueueConflict:
+            success, message, status = False, "The queue was changed by another user. It has been refreshed.", 409
+        except ValueError:
+            return JsonResponse({
+                "success": False,
+                "message": "Invalid order queue submission."
+            }, status=400)
+
+        pending_progress_orders = Order.objects.queue()
         paginator_pp = Paginator(pending_progress_orders, 10)
         paginated_pp = paginator_pp.get_page(page_number_pp)
 
         updated_html = render_to_string('includes/orders_queue.html', {'pending_progress': paginated_pp}, request=request)
 
         return JsonResponse({
-            "success": True,
-            "message": "Order queue updated successfully.",
+            "success": success,
+            "message": message,
             "orders_queue": updated_html
-        })
+        }, status=status)
     else:
         return JsonResponse({
             "success": False,
@@ -839,7 +673,7 @@ def update_order_queue(request):
 @login_required
 def refresh_order_queue(request):
     if request.method == "GET":
-        pending_progress_orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
+        pending_progress_orders = Order.objects.queue()
 
         page_number_pp = request.POST.get('page_pp', 1)
         paginator_pp = Paginator(pending_progress_orders, 10)
@@ -856,22 +690,40 @@ def refresh_order_queue(request):
 def get_paginated_orders(request):
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         if request.GET.get('page_pp'):
-            pending_progress_orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
+            pending_progress_orders = Order.objects.queue()
             paginator_pp = Paginator(pending_progress_orders, 10)
             page_number_pp = request.GET.get('page_pp')
             paginated_pp = paginator_pp.get_page(page_number_pp)
             html = render_to_string('includes/orders_queue.html', {'pending_progress': paginated_pp}, request=request)
-        if request.GET.get('page_cc'):
-            completed_cancelled_orders = Order.objects.filter(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
-            paginator_cc = Paginator(completed_cancelled_orders, 10)
-            page_number_cc = request.GET.get('page_cc')
-            paginated_cc = paginator_cc.get_page(page_number_cc)
+        if 'cursor_cc' in request.GET:
+            completed_cancelled_orders = Order.objects.archive()
+            paginated_cc = paginate_archive(completed_cancelled_orders, request.GET.get('cursor_cc'), 10)
             html = render_to_string('includes/orders_completed.html', {'completed_cancelled': paginated_cc}, request=request)
+            return JsonResponse({
+                'html': html,
+                'next_cursor': paginated_cc.next_cursor,
+                'previous_cursor': paginated_cc.previous_cursor,
+            }, status=200)
 
 
         return JsonResponse({'html': html}, status=200)
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+def _catalogue_etag(request):
+    if not hasattr(request, '_catalogue_version'):
+        request._catalogue_version = catalogue_version()
+    return quote_etag(f"catalogue-{request._catalogue_version}")
+
+@condition(etag_func=_catalogue_etag)
+def service_catalogue(request):
+    """
+    Services with their customization and pricing options in one document, loaded
+    once by the order form. Revalidation is a 304 until the catalogue changes.
+    """
+    response = JsonResponse(get_catalogue(request._catalogue_version))
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 def get_customization_options(request):
     """AJAX view to fetch customization options for a selected service."""
     service_id = request.GET.get('service_id')
@@ -915,11 +767,10 @@ def search_orders(request):
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         query = request.GET.get('query', '').strip()
         if query:
-            search_results = Order.objects.filter(
-                Q(service__name__icontains=query) | 
-                Q(customer__name__icontains=query) |
-                Q(status__icontains=query)
-            )[:10] 
+            # Ranked ids from the full-text index, then one query for the rows.
+            order_ids = cached_order_ids(query, limit=10)
+            orders = Order.objects.filter(order_id__in=order_ids).for_listing().with_queue_position().in_bulk()
+            search_results = [orders[order_id] for order_id in order_ids if order_id in orders]
 
             html = render_to_string('includes/orders_search_results.html', {'orders': search_results})
             return JsonResponse({'html': html})
@@ -928,52 +779,52 @@ def search_orders(request):
 
 from django.shortcuts import render
 from django.http import JsonResponse
-from .models import Production, Inventory, Order
+from .models import Production, Inventory, Order, QualityCheck
 from .forms import ProductionForm
 from django.views.decorators.csrf import csrf_exempt
+from .production_board import production_board
+from .equipment_materials import materials_for_equipment
 
 def production(request):
-    orders = Order.objects.exclude(status__in=["CANCELLED", "COMPLETED"]).order_by('order_queue')
-    materials = Inventory.objects.all()
-    production_jobs = Production.objects.all()
-    equipment_list = Equipment.objects.all()
-    staff_list = User.objects.all()
-    
-    context = {
-        'orders': orders,
-        'materials': materials,
-        'production_jobs': production_jobs,
-        'equipment_list': equipment_list,
-        'staff_list': staff_list,
-    }
+    context = production_board()
     return render(request, 'production.html', context)
 
 import json
+from django.core.exceptions import ValidationError
 def submit_production(request):
     if request.method == 'POST':
         data = request.POST
         materials_data = request.POST.getlist('materials[]')
         equipment_data = json.loads(request.POST.get('equipment_assigned', '[]'))
-        quality_checks_data = json.loads(request.POST.get('quality_checks', '[]')) 
+        try:
+            quality_checks = QualityCheck.objects.build(json.loads(request.POST.get('quality_checks') or '[]'))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Quality checks are not valid JSON.'}, status=400)
+        except ValidationError as error:
+            return JsonResponse({'success': False, 'error': error.message}, status=400)
 
         production = Production(
             order_id=data.get('order'),
             equipment_assigned=equipment_data,
             status='IN_PROGRESS',
             priority=data.get('priority', 'MODERATE'),
-            quality_checks=quality_checks_data or [],
         )
         production.save()
 
+        if quality_checks:
+            for check in quality_checks:
+                check.job = production
+            QualityCheck.objects.bulk_create(quality_checks)
+
         if materials_data:
             materials = Inventory.objects.filter(pk__in=materials_data)
             production.materials.set(materials) 
 
         order = Order.objects.get(order_id=data.get('order'))
-        order.status = 'IN_PROGRESS'
+        order.status = 'IN PROGRESS'
         order.save()
 
-        new_orders = Order.objects.filter(status='PENDING').order_by('order_queue')
+        new_orders = Order.objects.filter(status='PENDING').for_listing().with_queue_position().order_by('order_queue')
         print(new_orders)
         sidebar = render_to_string('includes/orders_search_results.html', {'orders': new_orders})
 
@@ -991,26 +842,20 @@ def submit_production(request):
 
 
 def fetch_materials(request):
-    equipment_name = request.GET.get('equipment_name')
-    if equipment_name:
-        equipment = Equipment.objects.get(name=equipment_name)
-        print(equipment)
-        
-        categories = InventoryCategory.objects.filter(associated_equipment=equipment)
-        print(categories)
-        
-        materials_list = []
-        
-        for category in categories:
-            materials = category.get_related_inventory() 
-            for material in materials:
-                materials_list.append({
-                    'id': material.material_id,
-                    'name': material.name,
-                })
-        
-        return JsonResponse({'materials': materials_list})
-    return JsonResponse({'error': 'Equipment ID not provided'}, status=400)
+    equipment_id = request.GET.get('equipment_id')
+    if not equipment_id and request.GET.get('equipment_name'):
+        # Older clients send the name; resolve it once to the id the mapping is keyed on.
+        equipment_id = Equipment.objects.filter(name=request.GET['equipment_name']).values_list(
+            'equipment_id', flat=True
+        ).first()
+        if equipment_id is None:
+            return JsonResponse({'error': 'Equipment not found'}, status=404)
+    try:
+        equipment_id = int(equipment_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Equipment ID not provided'}, status=400)
+
+    return JsonResponse({'materials': materials_for_equipment(equipment_id)})
 
 def filter_by_priority(request):
     priority = request.GET.get('priority')
@@ -1025,61 +870,51 @@ def filter_by_priority(request):
 def filter_by_status(request):
     status = request.GET.get('status')
     priority = request.GET.get('priority')
-    productions = Production.objects.filter(status=status, priority=priority)
+    productions = Production.objects.filter(status=status, priority=priority).select_related('order__customer')
     production_data = [{'id': p.job_id, 'name': f'Job #{p.job_id} - {p.order.customer.name}'} for p in productions]
     return JsonResponse({'productions': production_data})
 
 def fetch_quality_checks(request, production_id):
-    production = Production.objects.get(job_id=production_id)
-    quality_checks = production.quality_checks
-    print(quality_checks)
+    quality_checks = list(QualityCheck.objects.for_job(production_id))
     return JsonResponse({"quality_checks": quality_checks, "job_id": production_id})
 
 def get_quality_check(request, job_id, parameter):
-    try:
-        production = Production.objects.get(job_id=job_id)
-        quality_checks = production.quality_checks 
-        for check in quality_checks:
-            if check.get('parameter') == parameter:
-                return JsonResponse(check)
-        return JsonResponse({'message': 'Quality check not found.'}, status=404)
-    except Production.DoesNotExist:
+    check = QualityCheck.objects.for_job(job_id).filter(parameter=parameter).first()
+    if check:
+        return JsonResponse(check)
+    if not Production.objects.filter(job_id=job_id).exists():
         return JsonResponse({'message': 'Production not found.'}, status=404)
+    return JsonResponse({'message': 'Quality check not found.'}, status=404)
 
 def save_quality_check(request, job_id, parameter):
-    try:
-        save_type = ''
-        production = Production.objects.get(job_id=job_id)
-        quality_checks = production.quality_checks 
-
-        for i, check in enumerate(quality_checks):
-            if check['parameter'] == parameter:
-                quality_checks[i] = {
-                    'parameter': request.POST.get('parameter'),
-                    'result': request.POST.get('result'),
-                    'notes': request.POST.get('notes')
-                }
-                save_type = "Modified"
-                break
-        else:
-            quality_checks.append({
-                'parameter': request.POST.get('parameter'),
-                'result': request.POST.get('result'),
-                'notes': request.POST.get('notes')
-            })
-            save_type = "Added"
-
-        production.quality_checks = quality_checks
-        production.save()
-
-        production = Production.objects.get(job_id=job_id)
-        quality_checks = production.quality_checks
-
-        return JsonResponse({"quality_checks": quality_checks, "job_id": job_id, "save_type": save_type})
-
-    except Production.DoesNotExist:
+    if not Production.objects.filter(job_id=job_id).exists():
         return JsonResponse({'message': 'Production not found.'}, status=404)
 
+    try:
+        _, created = QualityCheck.objects.upsert(
+            job_id, parameter,
+            result=request.POST.get('result') or 'on_progress',
+            notes=request.POST.get('notes'),
+            new_parameter=request.POST.get('parameter'),
+        )
+    except ValidationError as error:
+        return JsonResponse({'message': error.message}, status=409 if error.code == 'unique' else 400)
+    save_type = "Added" if created else "Modified"
+
+    quality_checks = list(QualityCheck.objects.for_job(job_id))
+    return JsonResponse({"quality_checks": quality_checks, "job_id": job_id, "save_type": save_type})
+
+def quality_fail_rates(request):
+    """Fail rate of the quality checks across all jobs, per parameter and per service."""
+    checks = QualityCheck.objects.exclude(result='on_progress')
+    return JsonResponse({
+        'by_parameter': list(checks.fail_rates('parameter')),
+        'by_service': [
+            {'service': row['job__order__service__name'], 'total': row['total'], 'failed': row['failed'], 'fail_rate': row['fail_rate']}
+            for row in checks.fail_rates('job__order__service__name')
+        ],
+    })
+
 
 # AJAX view for updating production job status
 @csrf_exempt
@@ -1109,10 +944,25 @@ def update_production_status(request, job_id):
 
 def search_production(request):
     query = request.GET.get("q", "")
-    results = Production.objects.filter(job_id__icontains=query) if query else []
-    return render(request, "includes/production/search_results.html", {"results": results})
+    results = production_jobs(query) if query else []
+    return render(request, "includes/production/production_search_results.html", {"results": results})
+
+def typeahead(request):
+    """JSON suggestions for the order and production search boxes."""
+    scope = request.GET.get('scope', 'orders')
+    query = request.GET.get('q', '')
+    if scope == 'orders':
+        results = order_suggestions(query)
+    elif scope == 'production':
+        results = production_suggestions(query)
+    else:
+        return JsonResponse({'error': 'Invalid scope'}, status=400)
 
-def inventory_management(request):
+    response = JsonResponse({'query': normalize_query(query), 'results': results})
+    response['Cache-Control'] = 'private, max-age=10'
+    return response
+
+def organize_inventory():
     categories = InventoryCategory.objects.all()
     organized_inventory = {}
 
@@ -1135,8 +985,15 @@ def inventory_management(request):
             }
             for item in inventory_items
         ]
+    return organized_inventory
 
-    return render(request, "includes/production/production_inventory.html", {"inventory": organized_inventory})
+def inventory_management(request):
+    # organize_inventory is passed uncalled; the template calls it on a fragment cache miss.
+    return render(request, "includes/production/production_inventory.html", {
+        "inventory": organize_inventory,
+        "generations": generations(Inventory, InventoryCategory, Supplier),
+        "fragment_timeout": FRAGMENT_TIMEOUT,
+    })
 
 from django.db.models import F
 def inventory_alerts(request):
@@ -1154,9 +1011,69 @@ def contact_supplier(request):
     return JsonResponse({"status": "error", "message": "Invalid request"})
 
 
+from datetime import datetime, time, timedelta
+CRM_PAGE_SIZE = 12
+CRM_HISTORY_PREVIEW = 5
+CRM_DORMANT_AFTER = timedelta(days=90)
+
+def crm_dormant_since():
+    # Cut off at local midnight so the dormant list only changes once a day, in step
+    # with the date in the crm_customer_cards cache key.
+    return timezone.make_aware(datetime.combine(timezone.localdate() - CRM_DORMANT_AFTER, time.min))
+
+CRM_SORTS = {
+    'name': ('Name', lambda customers: customers.order_by('name', 'customer_id')),
+    'top': ('Top spenders', lambda customers: customers.top_spenders().order_by('-total_paid', 'customer_id')),
+    'outstanding': ('Outstanding balance', lambda customers: customers.with_outstanding_balance().order_by(
+        '-outstanding_balance', 'customer_id'
+    )),
+    'dormant': ('Dormant', lambda customers: customers.dormant(crm_dormant_since()).order_by(
+        F('last_order_at').asc(nulls_first=True), 'customer_id'
+    )),
+}
+
 def crm_view(request):
-    customers = Customer.objects.all() 
-    return render(request, 'crm.html', {'customers': customers})
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort') if request.GET.get('sort') in CRM_SORTS else 'name'
+    customers = CRM_SORTS[sort][1](Customer.objects.search(query)).with_history_preview(CRM_HISTORY_PREVIEW)
+    paginated_customers = Paginator(customers, CRM_PAGE_SIZE).get_page(request.GET.get('page'))
+
+    return render(request, 'crm.html', {
+        'customers': paginated_customers,
+        'query': query,
+        'sort': sort,
+        'sorts': [(key, label) for key, (label, _) in CRM_SORTS.items()],
+        'history_preview': CRM_HISTORY_PREVIEW,
+        'generations': generations(Customer, Order, Payment),
+        'fragment_timeout': FRAGMENT_TIMEOUT,
+        'today': timezone.localdate(),
+    })
+
+def customer_autocomplete(request):
+    customers = Customer.objects.autocomplete(request.GET.get('q', '')).values(
+        'customer_id', 'name', 'contact_number', 'email'
+    )
+    response = JsonResponse({'results': [
+        {
+            'id': customer['customer_id'],
+            'name': customer['name'],
+            'contact_number': customer['contact_number'],
+            'email': customer['email'],
+        }
+        for customer in customers
+    ]})
+    response['Cache-Control'] = 'private, max-age=10'
+    return response
+
+def crm_customer_history(request, customer_id):
+    customer = get_object_or_404(Customer, customer_id=customer_id)
+    orders = customer.orders.select_related('service').order_by('-created_at', '-order_id')
+    payments = Payment.objects.filter(order__customer=customer).order_by('-payment_date')
+
+    return JsonResponse({
+        'order_history': render_to_string('includes/crm/crm_order_history.html', {'orders': orders}),
+        'payment_history': render_to_string('includes/crm/crm_payment_history.html', {'payments': payments}),
+    })
 
 # PAYMENT VIEWS
 def payment(request):
@@ -1205,3 +1122,26 @@ def new_payment(request):
 
 def estimatesv2(request):
    return render(request, "estimates2.html")
+
+from django.views.decorators.http import require_POST
+from .quotes import QuoteError, quote_batch
+
+@require_POST
+def quote_estimates(request):
+   """
+   Batch price quotes: POST {"quotes": [{"service_id", "items": [{"pricing_option_id",
+   "quantity"}], "discount", "discount_type"}, ...]} and get one result per quote.
+   """
+   try:
+      payload = json.loads(request.body)
+      quote_requests = payload['quotes']
+      if not isinstance(quote_requests, list):
+         raise TypeError
+   except (ValueError, KeyError, TypeError):
+      return JsonResponse({'error': 'Expected a JSON object with a "quotes" list.'}, status=400)
+
+   try:
+      results = quote_batch(quote_requests)
+   except QuoteError as error:
+      return JsonResponse({'error': str(error)}, status=400)
+   return JsonResponse({'quotes': results})